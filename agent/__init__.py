@@ -1,8 +1,21 @@
 """
 Agent integration module for the MCP Data Assistant.
+
+The assistant is imported on first access, so importing a submodule such as
+agent.ollama_integration does not build the agent or start its event loop.
 """
 
-from agent.assistant import answer, _check_ollama_available
+import importlib
+
 from agent.session_manager import session_manager
 
-__all__ = ["answer", "_check_ollama_available", "session_manager"]
+_ASSISTANT_EXPORTS = ("answer", "answer_many", "refresh_env", "_check_ollama_available")
+
+
+def __getattr__(name):
+    if name in _ASSISTANT_EXPORTS:
+        return getattr(importlib.import_module("agent.assistant"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["answer", "answer_many", "refresh_env", "_check_ollama_available", "session_manager"]
@@ -1,16 +1,42 @@
 from __future__ import annotations
 import os
 import asyncio
+import atexit
+import concurrent.futures
+import hashlib
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import AsyncExitStack
 from typing import Optional, Any
-from agents import Agent, Runner, ModelSettings, set_tracing_disabled
+import anyio
+import httpx
+from agents import (
+    Agent,
+    AsyncOpenAI,
+    Runner,
+    ModelSettings,
+    set_default_openai_client,
+    set_tracing_disabled,
+)
+from agents.items import ToolCallItem
 from agents.mcp import MCPServerSse
+from mcp.shared.exceptions import McpError
+from .mcp_transport import MCPServerInMemory
 from .session_manager import session_manager
 from .ollama_integration import (
+    HTTP2_AVAILABLE,
+    HTTP_LIMITS,
+    HTTP_TIMEOUT,
     check_ollama_available,
     create_ollama_model,
     get_ollama_model_name,
+    refresh_env as _refresh_ollama_env,
 )
 
+logger = logging.getLogger(__name__)
+
 # Disable tracing for local models to avoid errors
 set_tracing_disabled(True)
 
@@ -20,14 +46,101 @@ MCP_SSE_URL = os.getenv(
     "http://127.0.0.1:7860/gradio_api/mcp/sse",
 )
 
+# MCP transport: "sse" (default) or "inmemory" when Gradio runs in this process.
+# The pinned agents SDK and Gradio 5.29 do not offer streamable HTTP yet.
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse").lower()
+if MCP_TRANSPORT not in ("sse", "inmemory"):
+    logger.warning("Unsupported MCP_TRANSPORT '%s', using SSE", MCP_TRANSPORT)
+    MCP_TRANSPORT = "sse"
+
 # Create MCP server instance but don't connect yet
-mcp_server = MCPServerSse(
+mcp_server: Any = MCPServerSse(
     params={"url": MCP_SSE_URL},
     cache_tools_list=True,
 )
 
-# Base agent instructions
-BASE_INSTRUCTIONS = (
+# Dedicated event loop for agent runs. It lives for the whole process so the
+# MCP session and HTTP connection pools survive between answer() calls.
+_AGENT_LOOP = asyncio.new_event_loop()
+threading.Thread(
+    target=_AGENT_LOOP.run_forever, name="agent-loop", daemon=True
+).start()
+
+# The MCP session is opened once and reused across answer() calls.
+# It is bound to the event loop that opened it.
+_mcp_loop: Optional[asyncio.AbstractEventLoop] = None
+_mcp_lock: Optional[asyncio.Lock] = None
+
+
+async def _ensure_mcp_connected() -> None:
+    """Connect to the MCP server unless a live session already exists."""
+    global _mcp_loop, _mcp_lock
+
+    loop = asyncio.get_running_loop()
+    if _mcp_loop is not loop:
+        # A session opened on another (now finished) loop cannot be reused
+        _mcp_loop = loop
+        _mcp_lock = asyncio.Lock()
+        mcp_server.session = None
+        mcp_server.exit_stack = AsyncExitStack()
+
+    async with _mcp_lock:
+        if mcp_server.session is None:
+            logger.debug("Connecting to MCP server...")
+            await mcp_server.connect()
+            logger.debug("MCP server connected successfully")
+
+
+# Errors that mean the MCP transport itself is broken. The SDK wraps tool-call
+# failures in AgentsException, so the cause chain is checked as well.
+_MCP_CONNECTION_ERRORS = (
+    ConnectionError,
+    httpx.HTTPError,
+    anyio.BrokenResourceError,
+    anyio.ClosedResourceError,
+    anyio.EndOfStream,
+    McpError,
+)
+
+
+def _is_mcp_connection_error(exc: Optional[BaseException]) -> bool:
+    """Whether ``exc`` or any exception it was raised from is a transport error."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, _MCP_CONNECTION_ERRORS):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+async def _reset_mcp_connection() -> None:
+    """Drop the shared MCP session so the next turn opens a new one."""
+    try:
+        await mcp_server.cleanup()
+    except Exception as e:
+        logger.debug("Error while closing MCP session: %s", e)
+    # cleanup() may fail part way when run from another task, so start afresh
+    mcp_server.session = None
+    mcp_server.exit_stack = AsyncExitStack()
+
+
+def _close_mcp_connection() -> None:
+    """Close the shared MCP session at interpreter shutdown."""
+    loop = _mcp_loop
+    if mcp_server.session is None or loop is None or not loop.is_running():
+        return
+    try:
+        future = asyncio.run_coroutine_threadsafe(mcp_server.cleanup(), loop)
+        future.result(timeout=5)
+    except Exception as e:
+        logger.warning("Could not close MCP connection: %s", e)
+
+
+atexit.register(_close_mcp_connection)
+
+# Base agent instructions, interned so every run shares the one prompt object
+BASE_INSTRUCTIONS = sys.intern(
     "You are a data assistant that can analyze tabular data and create PDFs.\n"
     "You can work with SQL databases, CSV files, and generate PDF reports.\n"
     "Common workflows include:\n"
@@ -67,7 +180,8 @@ BASE_INSTRUCTIONS = (
 # Use the same settings across providers for consistency (following the example)
 model_settings = ModelSettings(temperature=0.7, tool_choice="auto")
 
-# Initialize agent - we'll modify the model and instructions per session
+# Initialize agent - we'll modify the model per provider. The instructions
+# never change, so the system prompt is a stable, cacheable prefix.
 agent = Agent(
     name="NeurArk Data Assistant",
     instructions=BASE_INSTRUCTIONS,
@@ -76,11 +190,213 @@ agent = Agent(
     mcp_servers=[mcp_server],
 )
 
+# Once more than 2 * HISTORY_WINDOW messages are unsummarised, older ones are
+# folded into a rolling summary and only the last HISTORY_WINDOW are resent
+HISTORY_WINDOW = 12
+
+# OpenAI model used to summarise history (Ollama reuses the chat model)
+OPENAI_SUMMARY_MODEL = os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4.1-nano")
+
+# Provider settings are read once at import; call refresh_env() after changing them
+_HAS_OPENAI_KEY = bool(os.getenv("OPENAI_API_KEY"))
+_OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+
+
+# Pooled client handed to the SDK, kept so it can be closed when replaced
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def _configure_openai_client() -> None:
+    """Give the SDK one pooled OpenAI client instead of its per-provider default."""
+    global _openai_client
+    if not _HAS_OPENAI_KEY:
+        return
+    # HTTP/2 lets concurrent turns share one connection when h2 is installed
+    http_client = httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT
+    )
+    old_client, _openai_client = _openai_client, AsyncOpenAI(http_client=http_client)
+    set_default_openai_client(_openai_client, use_for_tracing=False)
+
+    # Close the replaced pool on the loop its connections belong to; new runs
+    # already use the new client
+    if old_client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(old_client.close(), _AGENT_LOOP).result(
+                timeout=5
+            )
+        except Exception as e:
+            logger.warning("Could not close the previous OpenAI client: %s", e)
+
+
+def refresh_env() -> None:
+    """Re-read the provider settings from the environment."""
+    global _HAS_OPENAI_KEY, _OPENAI_MODEL
+    _HAS_OPENAI_KEY = bool(os.getenv("OPENAI_API_KEY"))
+    _OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+    _refresh_ollama_env()
+    _configure_openai_client()
+
+
+_configure_openai_client()
+
+summary_agent = Agent(
+    name="History Summariser",
+    instructions=(
+        "Summarise the conversation below in a few sentences. Keep file paths,\n"
+        "table names, figures and decisions the user may refer to later.\n"
+    ),
+    model=OPENAI_SUMMARY_MODEL,
+    model_settings=ModelSettings(temperature=0.0),
+)
+
+# Wall-clock limit for one agent run, in seconds
+AGENT_TIMEOUT_S = float(os.getenv("AGENT_TIMEOUT_S", "120"))
+# A turn may summarise history and then run the agent, each bounded by
+# AGENT_TIMEOUT_S; the margin covers connecting to the MCP server
+TURN_TIMEOUT_S = 2 * AGENT_TIMEOUT_S + 30
+
+# Replies to identical turns can be reused; set AGENT_CACHE=1 to enable.
+# Off by default: tools read live data and write files, so a replay can be stale.
+AGENT_CACHE = os.getenv("AGENT_CACHE", "0") == "1"
+RESPONSE_CACHE_SIZE = 256
+_RESP_CACHE: OrderedDict[str, tuple[str, Any]] = OrderedDict()
+
+
+def _response_cache_key(
+    provider: str, model_name: str, prompt: str, session_id: str, continued: bool
+) -> str:
+    """Key a turn by everything that shapes the model input."""
+    session = session_manager.get_session(session_id)
+    history_hash = session.history_hash if session else ""
+    file_context = session_manager.get_file_context(session_id) or ""
+    data = f"{provider}|{model_name}|{continued}|{history_hash}|{file_context}|{prompt}"
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def _used_tools(result: Any) -> bool:
+    """Whether the run called any tool, so replaying it would skip side effects."""
+    return any(isinstance(item, ToolCallItem) for item in result.new_items)
+
+
+def _cache_response(key: str, response: str, result: Any) -> None:
+    """Store a reply, evicting the least recently used once the cache is full.
+
+    Runs that called tools are not stored: their SQL results may change and
+    their files (e.g. PDFs) must be written again.
+    """
+    if _used_tools(result):
+        return
+    _RESP_CACHE[key] = (response, result)
+    _RESP_CACHE.move_to_end(key)
+    while len(_RESP_CACHE) > RESPONSE_CACHE_SIZE:
+        _RESP_CACHE.popitem(last=False)
+
+
+def use_inmemory_mcp(server: Any) -> None:
+    """
+    Route tool calls to an MCP server object living in this process.
+
+    Args:
+        server: The low-level MCP server, e.g. ``demo.mcp_server_obj.mcp_server``
+    """
+    global mcp_server
+    # Close a session that is already open, on the loop that owns it, so the
+    # replaced SSE connection is not leaked
+    loop = _mcp_loop
+    if mcp_server.session is not None and loop is not None and loop.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(_reset_mcp_connection(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning("Could not close the previous MCP session: %s", e)
+    mcp_server = MCPServerInMemory(server, cache_tools_list=True)
+    agent.mcp_servers = [mcp_server]
+
+
 # Use the function from ollama_integration.py module
 # Just for backward compatibility with existing code
 _check_ollama_available = check_ollama_available
 
 
+async def _run_agent(run_agent: Agent, input_messages: list) -> Any:
+    """Run one agent turn over the shared MCP connection."""
+    # Reuse the persistent MCP connection (connects on first use)
+    try:
+        await _ensure_mcp_connected()
+    except Exception as e:
+        logger.warning("MCP server connection issue: %s", e)
+        await _reset_mcp_connection()
+
+    # max_turns bounds tool loops; the timeout bounds wall-clock time so a
+    # stuck request cannot hold up the shared agent loop
+    try:
+        async with asyncio.timeout(AGENT_TIMEOUT_S):
+            return await Runner.run(
+                starting_agent=run_agent,
+                input=input_messages,
+                max_turns=10,  # Prevent infinite loops
+            )
+    except TimeoutError:
+        raise TimeoutError(
+            f"The agent did not answer within {AGENT_TIMEOUT_S:g} seconds"
+        ) from None
+    except Exception as e:
+        # A dropped SSE connection would otherwise fail every later turn
+        if _is_mcp_connection_error(e):
+            logger.warning("MCP connection lost, reconnecting on the next turn: %s", e)
+            await _reset_mcp_connection()
+        raise
+
+
+async def _summarise_history(
+    session_id: str, model: Any, pending: Optional[list] = None
+) -> None:
+    """Fold messages older than the recent window into the session summary.
+
+    ``pending`` holds this turn's messages that are not stored in the session yet.
+    """
+    session = session_manager.get_session(session_id)
+    if not session:
+        return
+
+    start = session.summary_upto_idx
+    total = len(session.roles) + len(pending or ())
+    if total - start <= 2 * HISTORY_WINDOW:
+        return
+
+    end = total - HISTORY_WINDOW
+    lines = [
+        f"{role}: {content}"
+        for role, content in zip(session.roles[start:end], session.contents[start:end])
+    ]
+    if session.summary:
+        lines.insert(0, f"Earlier summary: {session.summary}\n")
+
+    async with asyncio.timeout(AGENT_TIMEOUT_S):
+        result = await Runner.run(
+            starting_agent=summary_agent.clone(model=model),
+            input="\n".join(lines),
+            max_turns=1,
+        )
+    session_manager.update_summary(session_id, result.final_output, end)
+
+
+def _summarised_input(session_id: str, pending: Optional[list] = None) -> Optional[list]:
+    """Build the model input from the summary plus the recent messages, if summarised."""
+    session = session_manager.get_session(session_id)
+    if not session or not session.summary:
+        return None
+
+    input_messages = [
+        {"role": "system", "content": f"Prior context summary:\n{session.summary}"}
+    ]
+    file_context = session_manager.get_file_context(session_id)
+    if file_context:
+        input_messages.append({"role": "system", "content": file_context})
+    input_messages.extend(session.to_input_list(session.summary_upto_idx))
+    return input_messages + (pending or [])
+
+
 def answer(
     prompt: str,
     provider: str = "openai",
@@ -103,156 +419,230 @@ def answer(
         # Create a new session if none provided
         if not session_id:
             session_id = session_manager.create_session()
-            print(f"Created new session: {session_id}")
+            logger.debug("Created new session: %s", session_id)
+        else:
+            # A session evicted while the UI still holds its ID is recreated,
+            # so this turn is recorded instead of silently dropped
+            session_manager.ensure_session(session_id)
 
         # Exit early if Ollama selected but not available
         if provider == "ollama" and not _check_ollama_available():
             return "⚠️ Ollama not available or not running.", None
 
         # Exit early if OpenAI selected but API key not set
-        if provider == "openai" and not os.getenv("OPENAI_API_KEY"):
+        if provider == "openai" and not _HAS_OPENAI_KEY:
             return "⚠️ OPENAI_API_KEY not set.", None
 
         try:
-            # Update instructions with session context
-            if session_id:
-                agent.instructions = session_manager.create_system_prompt(
-                    session_id, BASE_INSTRUCTIONS
-                )
-
             # Configure the model based on provider
             if provider == "ollama":
                 # Get the Ollama model
                 model_name = get_ollama_model_name()
-                print(f"Using Ollama model: {model_name}")
-
-                # Set the agent's model to use Ollama
-                agent.model = create_ollama_model()
+                logger.debug("Using Ollama model: %s", model_name)
+                model: Any = create_ollama_model()
             else:
                 # Get the OpenAI model
-                model_name = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
-                print(f"Using OpenAI model: {model_name}")
+                model_name = _OPENAI_MODEL
+                logger.debug("Using OpenAI model: %s", model_name)
+                model = model_name
 
-                # Set the agent's model to use OpenAI
-                agent.model = model_name
+            # Turns run concurrently, so each uses its own copy of the agent
+            # rather than setting the model on the shared one
+            run_agent = agent.clone(model=model)
 
         except Exception as e:
-            print(f"Error setting up provider: {str(e)}")
+            logger.error("Error setting up provider: %s", e)
             return f"⚠️ Error setting up {provider} client: {str(e)}", None
 
+        # Stored in the session together with the reply once the turn ends
+        user_message = {"role": "user", "content": prompt}
+
+        # Identical turns (same model, history, files and prompt) reuse the reply
+        cache_key = None
+        if AGENT_CACHE:
+            cache_key = _response_cache_key(
+                provider, model_name, prompt, session_id, prev_result is not None
+            )
+            cached = _RESP_CACHE.get(cache_key)
+            if cached is not None:
+                _RESP_CACHE.move_to_end(cache_key)
+                logger.debug("Response cache hit for session %s", session_id)
+                session_manager.add_messages(
+                    session_id, [user_message, {"role": "assistant", "content": cached[0]}]
+                )
+                session_manager.mark_file_context_sent(session_id)
+                return cached
+
         # Prepare input based on whether prev_result exists
         if prev_result:
             # Use the conversation history from the previous result
-            print("Using previous result to maintain conversation history")
-            # Add the new user message to the previous conversation history
-            input_messages = prev_result.to_input_list() + [
-                {"role": "user", "content": prompt}
-            ]
+            logger.debug("Using previous result to maintain conversation history")
+            # to_input_list() builds a fresh list, so extend it in place rather
+            # than copying the whole history again to add the new user message
+            input_messages = prev_result.to_input_list()
+            input_messages.append(user_message)
+            # File references already in the history are not repeated
+            file_context = session_manager.get_file_context(
+                session_id, only_if_changed=True
+            )
         else:
             # First message in conversation
-            print("Starting new conversation")
-            input_messages = [{"role": "user", "content": prompt}]
+            logger.debug("Starting new conversation")
+            input_messages = [user_message]
+            file_context = session_manager.get_file_context(session_id)
 
-        # Still store in session for persistence/logging (but won't be used directly)
-        session_manager.add_message(session_id, "user", prompt)
+        # Session files go in their own message after the history, never into
+        # the system prompt, so earlier content is not rewritten
+        if file_context:
+            input_messages.insert(-1, {"role": "system", "content": file_context})
 
-        print(f"Running agent with prompt: {prompt[:30]}...")
+        logger.debug("Running agent with prompt: %.30s...", prompt)
 
         try:
             # Define async function to run the agent
             async def run_agent_async():
-                # Connect to MCP server
+                nonlocal input_messages
+
+                # Keep the history sent to the model bounded by the window
                 try:
-                    print("Connecting to MCP server...")
-                    await mcp_server.connect()
-                    print("MCP server connected successfully")
-                except Exception as e:
-                    print(f"Warning: MCP server connection issue: {str(e)}")
-
-                # Use async context manager for clean connections
-                async with mcp_server:
-                    # Use input_messages from prev_result or new conversation
-                    print(f"Running with {len(input_messages)} messages in history")
-                    if len(input_messages) > 0:
-                        first_role = input_messages[0].get('role', '?')
-                        last_role = input_messages[-1].get('role', '?')
-                        print(f"First message: {first_role}, latest: {last_role}")
-
-                    result = await Runner.run(
-                        starting_agent=agent,
-                        input=input_messages,
-                        max_turns=10,  # Prevent infinite loops
+                    summary_model = (
+                        model if provider == "ollama" else OPENAI_SUMMARY_MODEL
                     )
+                    await _summarise_history(session_id, summary_model, [user_message])
+                except Exception as e:
+                    logger.warning("Could not summarise history: %s", e)
+                input_messages = (
+                    _summarised_input(session_id, [user_message]) or input_messages
+                )
 
-                    # Ensure we properly close any OpenAI clients if using Ollama
-                    if provider == "ollama":
-                        try:
-                            # Get the OpenAI client from the model and close it
-                            if hasattr(agent.model, "openai_client"):
-                                client = agent.model.openai_client
-                                if hasattr(client, "aclose"):
-                                    await client.aclose()
-                        except Exception as e:
-                            print(f"Warning when closing httpx client: {str(e)}")
+                # Use input_messages from prev_result or new conversation
+                logger.debug("Running with %d messages in history", len(input_messages))
 
-                    return result
+                return await _run_agent(run_agent, input_messages)
 
-            # Run the agent with better event loop handling
+            # Run the agent on the persistent background loop; the timeout keeps
+            # a stuck loop from holding this worker thread forever
+            future = asyncio.run_coroutine_threadsafe(run_agent_async(), _AGENT_LOOP)
             try:
-                try:
-                    # Vérifier si une boucle est déjà en cours d'exécution
-                    loop = asyncio.get_running_loop()
-                    # Si on est déjà dans une boucle asyncio, utiliser create_task
-                    task = asyncio.run_coroutine_threadsafe(run_agent_async(), loop)
-                    result = task.result()
-                except RuntimeError:
-                    # Aucune boucle en cours d'exécution, en créer une nouvelle
-                    result = asyncio.run(run_agent_async())
+                result = future.result(timeout=TURN_TIMEOUT_S)
+            except concurrent.futures.TimeoutError:
+                # The run's own timeouts surface as TimeoutError too; only a
+                # wait that expired on an unfinished run is a stuck loop
+                if future.done():
+                    raise
+                future.cancel()
+                raise TimeoutError(
+                    f"The agent loop did not finish the turn within {TURN_TIMEOUT_S:g} seconds"
+                ) from None
             except Exception as e:
-                print(f"Error during async execution: {str(e)}")
-                # Ensure any pending tasks are cleaned up
-                try:
-                    for task in asyncio.all_tasks():
-                        if not task.done():
-                            task.cancel()
-                except RuntimeError:
-                    # Handle the case where there's no running event loop
-                    pass
+                logger.error("Error during async execution: %s", e)
+                future.cancel()
                 raise
 
             # Get the response text
             response = result.final_output
-            print(
-                f"DEBUG - Raw LLM response from result.final_output: {response[:150]}"
-            )
 
-            # Store the assistant response in session history
-            session_manager.add_message(session_id, "assistant", response)
+            # Store the whole turn in session history at once
+            session_manager.add_messages(
+                session_id, [user_message, {"role": "assistant", "content": response}]
+            )
+            session_manager.mark_file_context_sent(session_id)
+            if cache_key is not None:
+                _cache_response(cache_key, response, result)
 
             # Return both the response and result object
             return response, result
 
         except Exception as e:
-            print(f"Error running agent: {str(e)}")
-            import traceback
+            # The traceback is only formatted when debug logging is on
+            logger.error("Error running agent: %s", e)
+            logger.debug("Agent run failed", exc_info=True)
 
-            print(traceback.format_exc())
-
-            # Add error message to history
+            # Add the turn with its error message to history
             error_msg = f"Error: {str(e)}"
-            session_manager.add_message(session_id, "assistant", error_msg)
+            session_manager.add_messages(
+                session_id, [user_message, {"role": "assistant", "content": error_msg}]
+            )
             return error_msg, None
 
     except Exception as e:
-        import traceback
-
-        error_trace = traceback.format_exc()
-        print(f"Agent error: {str(e)}")
-        print(f"Error trace: {error_trace}")
+        logger.error("Agent error: %s", e)
+        logger.debug("Agent error", exc_info=True)
 
         # Add error to history if session exists
         if session_id:
             error_response = f"Error: {str(e)}"
             session_manager.add_message(session_id, "assistant", error_response)
 
-        return f"Error: {str(e)}\nTrace: {error_trace}", None
+        return f"Error: {str(e)}", None
+
+
+async def answer_many(
+    prompts: list[tuple[str, Optional[str]]],
+    provider: str = "openai",
+    max_concurrency: int = 10,
+) -> list:
+    """
+    Answer several independent prompts concurrently.
+
+    Each prompt runs as a fresh conversation in its own session, sharing the
+    persistent MCP connection. At most ``max_concurrency`` agent runs are in
+    flight at once.
+
+    Args:
+        prompts: (prompt, session_id) pairs; a session is created when session_id is None
+        provider: The LLM provider (openai or ollama)
+        max_concurrency: Maximum number of concurrent agent runs
+
+    Returns:
+        list: (response, result) tuples in the same order as ``prompts``
+    """
+    # Provider checks are done once for the whole batch
+    if provider == "ollama":
+        if not _check_ollama_available():
+            return [("⚠️ Ollama not available or not running.", None)] * len(prompts)
+        model: Any = create_ollama_model()
+    else:
+        if not _HAS_OPENAI_KEY:
+            return [("⚠️ OPENAI_API_KEY not set.", None)] * len(prompts)
+        model = _OPENAI_MODEL
+
+    # The shared agent is not mutated while other turns may be running
+    run_agent = agent.clone(model=model)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(prompt: str, session_id: Optional[str]) -> tuple:
+        if not session_id:
+            session_id = session_manager.create_session()
+        else:
+            session_manager.ensure_session(session_id)
+
+        user_message = {"role": "user", "content": prompt}
+        input_messages = [user_message]
+        file_context = session_manager.get_file_context(session_id)
+        if file_context:
+            input_messages.insert(0, {"role": "system", "content": file_context})
+
+        async with semaphore:
+            try:
+                # Agent runs always execute on the loop that owns the MCP session
+                future = asyncio.run_coroutine_threadsafe(
+                    _run_agent(run_agent, input_messages), _AGENT_LOOP
+                )
+                result = await asyncio.wrap_future(future)
+            except Exception as e:
+                error_msg = f"Error: {str(e)}"
+                session_manager.add_messages(
+                    session_id,
+                    [user_message, {"role": "assistant", "content": error_msg}],
+                )
+                return error_msg, None
+
+        response = result.final_output
+        session_manager.add_messages(
+            session_id, [user_message, {"role": "assistant", "content": response}]
+        )
+        session_manager.mark_file_context_sent(session_id)
+        return response, result
+
+    return await asyncio.gather(*(_bounded(p, sid) for p, sid in prompts))
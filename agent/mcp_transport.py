@@ -0,0 +1,70 @@
+"""
+In-process MCP transport for the MCP Data Assistant.
+
+By default the agent reaches the Gradio MCP server over SSE. When the
+agent and Gradio run in the same process, MCPServerInMemory talks to
+Gradio's MCP server object through memory streams instead, skipping the
+HTTP stack entirely.
+
+MCPServerInMemory builds on the SDK's private ``_MCPServerWithClientSession``,
+which is why openai-agents is pinned to an exact version in requirements.txt.
+Re-run tests/test_assistant.py before upgrading it.
+"""
+
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import Any
+
+import anyio
+from agents.mcp.server import _MCPServerWithClientSession
+from mcp.server import Server
+from mcp.shared.memory import create_client_server_memory_streams
+
+
+class MCPServerInMemory(_MCPServerWithClientSession):
+    """MCP server reached through in-memory streams in the current process."""
+
+    def __init__(
+        self,
+        server: Server,
+        cache_tools_list: bool = False,
+        name: str | None = None,
+        client_session_timeout_seconds: float | None = 5,
+    ):
+        """
+        Args:
+            server: The low-level MCP server to talk to (for Gradio apps,
+                ``demo.mcp_server_obj.mcp_server``)
+            cache_tools_list: Whether to cache the tools list after the first fetch
+            name: A readable name for the server
+            client_session_timeout_seconds: Read timeout for the MCP ClientSession
+        """
+        super().__init__(cache_tools_list, client_session_timeout_seconds)
+        self.server = server
+        self._name = name or f"inmemory: {server.name}"
+
+    @asynccontextmanager
+    async def _serve(self) -> Any:
+        """Run the server on one end of a stream pair and yield the other end."""
+        async with create_client_server_memory_streams() as (client_streams, server_streams):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(
+                    self.server.run,
+                    server_streams[0],
+                    server_streams[1],
+                    self.server.create_initialization_options(),
+                )
+                try:
+                    yield client_streams
+                finally:
+                    tg.cancel_scope.cancel()
+
+    def create_streams(self) -> Any:
+        """Create the streams for the server."""
+        return self._serve()
+
+    @property
+    def name(self) -> str:
+        """A readable name for the server."""
+        return self._name
@@ -5,7 +5,11 @@ Simple direct integration with OpenAI Agents SDK, following the pattern from
 examples in the SDK documentation.
 """
 
+import importlib.util
 import os
+import time
+from typing import Dict, Optional, Tuple
+
 import httpx
 from agents import OpenAIChatCompletionsModel, AsyncOpenAI, set_tracing_disabled
 
@@ -16,23 +20,82 @@ set_tracing_disabled(True)
 OLLAMA_API_BASE = "http://localhost:11434"
 OLLAMA_V1_API = f"{OLLAMA_API_BASE}/v1"
 
+# Pool and timeout settings shared by the async HTTP clients
+HTTP_LIMITS = httpx.Limits(
+    max_connections=500, max_keepalive_connections=100, keepalive_expiry=30.0
+)
+HTTP_TIMEOUT = httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=10.0)
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Availability probe results are reused for a few seconds
+OLLAMA_CHECK_TTL = 5.0
+_OLLAMA_OK_CACHE: Optional[Tuple[float, bool]] = None
+_probe_client: Optional[httpx.Client] = None
+
+# Shared Ollama client and per-model wrappers, reused across turns
+_ollama_client: Optional[AsyncOpenAI] = None
+_ollama_models: Dict[str, OpenAIChatCompletionsModel] = {}
+
+
+def _get_probe_client() -> httpx.Client:
+    """Return the pooled HTTP client used for availability probes."""
+    global _probe_client
+    if _probe_client is None:
+        _probe_client = httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=4),
+            timeout=2.0,
+        )
+    return _probe_client
+
 
 def check_ollama_available():
     """Check if Ollama is running and accessible."""
+    global _OLLAMA_OK_CACHE
+
+    now = time.monotonic()
+    if _OLLAMA_OK_CACHE is not None and now - _OLLAMA_OK_CACHE[0] < OLLAMA_CHECK_TTL:
+        return _OLLAMA_OK_CACHE[1]
+
     try:
-        # Use a client with context manager to ensure proper cleanup
-        with httpx.Client(timeout=2.0) as client:
-            response = client.get(f"{OLLAMA_API_BASE}/api/tags")
-            return response.status_code == 200
+        response = _get_probe_client().get(f"{OLLAMA_API_BASE}/api/tags")
+        available = response.status_code == 200
     except Exception:
-        return False
+        available = False
+
+    _OLLAMA_OK_CACHE = (now, available)
+    return available
+
+
+# Model name read once at import; call refresh_env() after changing OLLAMA_MODEL
+# Utiliser qwen3:8b comme modèle par défaut
+_OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen3:8b")
+
+
+def refresh_env() -> None:
+    """Re-read OLLAMA_MODEL from the environment."""
+    global _OLLAMA_MODEL
+    _OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "qwen3:8b")
 
 
 def get_ollama_model_name():
     """Get the model name to use with Ollama."""
-    # Get model name from environment or use default
-    # Utiliser qwen3:8b comme modèle par défaut
-    return os.getenv("OLLAMA_MODEL", "qwen3:8b")
+    return _OLLAMA_MODEL
+
+
+def _get_ollama_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client pointed at Ollama."""
+    global _ollama_client
+    if _ollama_client is None:
+        _ollama_client = AsyncOpenAI(
+            base_url=OLLAMA_V1_API,
+            api_key="ollama",  # Just a placeholder value
+            timeout=HTTP_TIMEOUT,  # Add timeout to prevent hanging
+            # Ollama serves plain HTTP/1.1, so keep-alive pooling is what matters
+            http_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+        )
+    return _ollama_client
 
 
 def create_ollama_model():
@@ -40,20 +103,21 @@ def create_ollama_model():
     Create an OpenAIChatCompletionsModel configured for Ollama,
     using the simple pattern shown in SDK examples.
 
+    Models are cached per model name and share one client, so the
+    HTTP connection pool is kept alive between calls.
+
     Returns:
         OpenAIChatCompletionsModel: Model configured to use Ollama
     """
     model_name = get_ollama_model_name()
 
-    # Create and return the model
-    # Après vérification de la documentation, nous utilisons simplement la configuration de base
     # Les paramètres comme temperature et tool_choice seront configurés au niveau de l'agent,
     # pas au niveau du modèle ou du client
-    return OpenAIChatCompletionsModel(
-        model=model_name,
-        openai_client=AsyncOpenAI(
-            base_url=OLLAMA_V1_API,
-            api_key="ollama",  # Just a placeholder value
-            timeout=30.0,  # Add timeout to prevent hanging
-        ),
-    )
+    model = _ollama_models.get(model_name)
+    if model is None:
+        model = OpenAIChatCompletionsModel(
+            model=model_name,
+            openai_client=_get_ollama_client(),
+        )
+        _ollama_models[model_name] = model
+    return model
@@ -1,17 +1,34 @@
 from __future__ import annotations
-import uuid
+import hashlib
+import logging
+import secrets
+import sys
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Upper bound on live sessions kept in memory
+MAX_SESSIONS = 1024
+
+# Sessions untouched for longer than this (seconds) are pruned
+SESSION_IDLE_TIMEOUT = 3600.0
+
+# Upper bound on messages kept per session; the oldest are dropped first
+MAX_HISTORY = 200
+
+
+@dataclass(slots=True)
 class SessionContext:
     """
     Stores context information for a chat session.
     """
 
-    # History tracking
-    messages: List[Dict[str, str]] = field(default_factory=list)
+    # History tracking, stored as parallel role/content lists; roles are interned
+    roles: List[str] = field(default_factory=list)
+    contents: List[str] = field(default_factory=list)
 
     # File tracking
     files: Dict[str, str] = field(default_factory=dict)
@@ -19,6 +36,72 @@ class SessionContext:
     # Additional metadata
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    # Rolling hash of every message appended, used as a response cache key
+    history_hash: str = ""
+
+    # Rolling summary of messages[:summary_upto_idx]
+    summary: str = ""
+    summary_upto_idx: int = 0
+
+    # Monotonic timestamp of the last lookup, used for idle pruning
+    last_access: float = field(default_factory=time.monotonic)
+
+    # Rendered file listing, rebuilt only when files change
+    _file_context_cache: Optional[str] = None
+    _files_version: int = 0
+
+    # Files version last sent to the model as a context message
+    _files_sent_version: int = 0
+
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """The conversation history as role/content dicts."""
+        return self.to_input_list()
+
+    def to_input_list(self, start: int = 0) -> List[Dict[str, str]]:
+        """
+        Build model input messages from the history.
+
+        Args:
+            start: Index of the first message to include
+
+        Returns:
+            List[Dict[str, str]]: Messages from ``start`` onwards
+        """
+        return [
+            {"role": role, "content": content}
+            for role, content in zip(self.roles[start:], self.contents[start:])
+        ]
+
+
+def _chain_hash(history_hash: str, role: str, content: str) -> str:
+    """Extend a rolling history hash with one message."""
+    data = f"{history_hash}|{role}|{content}".encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class LRUSessionStore(OrderedDict):
+    """
+    Session mapping that evicts the least recently used entry once
+    it holds more than ``max_sessions`` sessions.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        super().__init__()
+        self.max_sessions = max_sessions
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_sessions:
+            self.popitem(last=False)
+
 
 class SessionManager:
     """
@@ -31,17 +114,21 @@ class SessionManager:
     - Providing context to the agent
     """
 
-    def __init__(self):
-        self.sessions: Dict[str, SessionContext] = {}
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.sessions: LRUSessionStore = LRUSessionStore(max_sessions)
 
     def create_session(self) -> str:
         """
         Create a new session with a unique ID.
 
+        Idle sessions are pruned first; if the store is still full, the
+        least recently used session is evicted.
+
         Returns:
             str: The session ID
         """
-        session_id = str(uuid.uuid4())
+        self.prune_idle_sessions()
+        session_id = secrets.token_hex(16)
         self.sessions[session_id] = SessionContext()
         return session_id
 
@@ -55,7 +142,30 @@ class SessionManager:
         Returns:
             Optional[SessionContext]: The session context if found, None otherwise
         """
-        return self.sessions.get(session_id)
+        session = self.sessions.get(session_id)
+        if session:
+            session.last_access = time.monotonic()
+        return session
+
+    def ensure_session(self, session_id: str) -> SessionContext:
+        """
+        Get a session, recreating it under the same ID if it was evicted.
+
+        The UI keeps session IDs in its own state, so an ID can outlive its
+        session after idle pruning or LRU eviction.
+
+        Args:
+            session_id: The session ID
+
+        Returns:
+            SessionContext: The existing or recreated session
+        """
+        session = self.get_session(session_id)
+        if session is None:
+            logger.warning("Session %s expired, starting it again", session_id)
+            self.prune_idle_sessions()
+            session = self.sessions[session_id] = SessionContext()
+        return session
 
     def add_message(self, session_id: str, role: str, content: str) -> None:
         """
@@ -68,7 +178,36 @@ class SessionManager:
         """
         session = self.get_session(session_id)
         if session:
-            session.messages.append({"role": role, "content": content})
+            session.roles.append(sys.intern(role))
+            session.contents.append(content)
+            session.history_hash = _chain_hash(session.history_hash, role, content)
+            self._trim_history(session)
+
+    def add_messages(self, session_id: str, messages: List[Dict[str, str]]) -> None:
+        """
+        Add several messages to the conversation history in one step.
+
+        Args:
+            session_id: The session ID
+            messages: Messages with "role" and "content" keys, in order
+        """
+        session = self.get_session(session_id)
+        if session:
+            for message in messages:
+                role, content = sys.intern(message["role"]), message["content"]
+                session.roles.append(role)
+                session.contents.append(content)
+                session.history_hash = _chain_hash(session.history_hash, role, content)
+            self._trim_history(session)
+
+    @staticmethod
+    def _trim_history(session: SessionContext) -> None:
+        """Drop the oldest messages once a session holds more than MAX_HISTORY."""
+        excess = len(session.roles) - MAX_HISTORY
+        if excess > 0:
+            del session.roles[:excess]
+            del session.contents[:excess]
+            session.summary_upto_idx = max(0, session.summary_upto_idx - excess)
 
     def get_messages(self, session_id: str) -> List[Dict[str, str]]:
         """
@@ -96,12 +235,32 @@ class SessionManager:
             bool: True if a message was removed, False otherwise
         """
         session = self.get_session(session_id)
-        if session and session.messages:
-            removed = session.messages.pop()
-            print(f"Removed last message: {removed.get('role', '?')}")
+        if session and session.roles:
+            removed_role = session.roles.pop()
+            session.contents.pop()
+            session.summary_upto_idx = min(session.summary_upto_idx, len(session.roles))
+            # A rolling hash cannot be unwound, so rebuild it from what is left
+            session.history_hash = ""
+            for role, content in zip(session.roles, session.contents):
+                session.history_hash = _chain_hash(session.history_hash, role, content)
+            logger.debug("Removed last message: %s", removed_role)
             return True
         return False
 
+    def update_summary(self, session_id: str, summary: str, upto_idx: int) -> None:
+        """
+        Replace the rolling summary of older messages.
+
+        Args:
+            session_id: The session ID
+            summary: Summary covering messages before ``upto_idx``
+            upto_idx: Index of the first message not covered by the summary
+        """
+        session = self.get_session(session_id)
+        if session:
+            session.summary = summary
+            session.summary_upto_idx = upto_idx
+
     def register_file(self, session_id: str, file_type: str, file_path: str) -> None:
         """
         Register a file with the session.
@@ -114,6 +273,9 @@ class SessionManager:
         session = self.get_session(session_id)
         if session:
             session.files[file_type] = file_path
+            # Invalidate the cached file listing
+            session._files_version += 1
+            session._file_context_cache = None
 
     def get_file(self, session_id: str, file_type: str) -> Optional[str]:
         """
@@ -146,30 +308,48 @@ class SessionManager:
             return session.files.copy()
         return {}
 
-    def create_system_prompt(self, session_id: str, base_prompt: str) -> str:
+    def get_file_context(
+        self, session_id: str, only_if_changed: bool = False
+    ) -> Optional[str]:
         """
-        Create a system prompt that includes file references.
+        Render the registered files as a standalone context message.
+
+        Sending this separately from the system prompt keeps the prompt
+        prefix stable, so provider-side prompt caches stay valid.
 
         Args:
             session_id: The session ID
-            base_prompt: The base system prompt
+            only_if_changed: Return None unless files changed since the
+                last call to mark_file_context_sent
 
         Returns:
-            str: Enhanced system prompt with file references
+            Optional[str]: The file listing, or None if there is nothing to send
         """
         session = self.get_session(session_id)
-        if not session:
-            return base_prompt
-
-        # If files are registered, add them to the prompt
-        if session.files:
-            file_info = "\n\nAvailable files:\n"
-            for file_type, file_path in session.files.items():
-                file_info += f"- {file_type.upper()}: {file_path}\n"
-
-            return base_prompt + file_info
+        if not session or not session.files:
+            return None
+        if only_if_changed and session._files_sent_version == session._files_version:
+            return None
+
+        if session._file_context_cache is None:
+            parts = ["Available files:\n"]
+            parts.extend(
+                f"- {file_type.upper()}: {file_path}\n"
+                for file_type, file_path in session.files.items()
+            )
+            session._file_context_cache = "".join(parts)
+        return session._file_context_cache
+
+    def mark_file_context_sent(self, session_id: str) -> None:
+        """
+        Record that the current file listing has reached the model.
 
-        return base_prompt
+        Args:
+            session_id: The session ID
+        """
+        session = self.get_session(session_id)
+        if session:
+            session._files_sent_version = session._files_version
 
     def clear_session(self, session_id: str) -> bool:
         """
@@ -183,21 +363,43 @@ class SessionManager:
         """
         session = self.get_session(session_id)
         if session:
-            # Clear messages but preserve file references
-            files_copy = session.files.copy()  # Make a copy for debug reporting
-            # No need to copy metadata for now, but might be useful in the future
+            # Reset messages and their summary but preserve file references
+            session.roles = []
+            session.contents = []
+            session.history_hash = ""
+            session.summary = ""
+            session.summary_upto_idx = 0
+
+            logger.debug(
+                "Cleared messages for session %s, preserved %d file references",
+                session_id,
+                len(session.files),
+            )
+            return True
 
-            # Reset messages to empty list
-            session.messages = []
+        logger.debug("Session %s not found", session_id)
+        return False
 
-            # Debug logging
-            print(f"SessionManager: Cleared messages for session {session_id}")
-            print(f"SessionManager: Preserved {len(files_copy)} file references")
+    def prune_idle_sessions(self, max_idle: float = SESSION_IDLE_TIMEOUT) -> int:
+        """
+        Delete sessions that have not been accessed recently.
 
-            return True
+        Args:
+            max_idle: Maximum idle time in seconds
 
-        print(f"SessionManager: Session {session_id} not found")
-        return False
+        Returns:
+            int: The number of sessions deleted
+        """
+        cutoff = time.monotonic() - max_idle
+        pruned = 0
+        # Sessions are kept in access order, so stop at the first active one
+        while self.sessions:
+            oldest_id = next(iter(self.sessions))
+            if self.sessions[oldest_id].last_access >= cutoff:
+                break
+            del self.sessions[oldest_id]
+            pruned += 1
+        return pruned
 
     def delete_session(self, session_id: str) -> bool:
         """
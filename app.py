@@ -1,21 +1,366 @@
 # existing imports
+import ast
+import asyncio
+import concurrent.futures
+import copy
 import gradio as gr
+import functools
+import hashlib
+import importlib
+import importlib.util
 import json
+import logging
 import os
-import uuid
+import re
 import shutil
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from jsonschema import validate, ValidationError
-from tools.sql_tool import run_sql
-from tools.csv_tool import summarise_csv
-from tools.pdf_tool import create_pdf
 from tools.default_paths import DATA_DIR, UPLOADS_DIR
 from agent import answer, _check_ollama_available, session_manager
+from agent.assistant import MCP_TRANSPORT, use_inmemory_mcp
+
+# orjson (installed with Gradio) is much faster; fall back to the stdlib if missing
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Per-request logging; debug messages are only formatted when enabled
+logger = logging.getLogger("mcp_app")
+logger.setLevel(os.getenv("GRADIO_LOG_LEVEL", "INFO").upper())
+
+# Heavy tool modules (pandas, SQLAlchemy, reportlab, matplotlib) are imported on first use
+_lazy = {}
+
+
+def _resolve(module, name):
+    """
+    Import ``module`` once and return its attribute ``name``.
+
+    Args:
+        module: Dotted module path
+        name: Attribute to fetch from the module
+
+    Returns:
+        The requested attribute
+    """
+    key = f"{module}.{name}"
+    attr = _lazy.get(key)
+    if attr is None:
+        attr = _lazy[key] = getattr(importlib.import_module(module), name)
+    return attr
+
+
+# Background pool for upload file I/O, kept off the request thread
+_IO_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-io")
+
+# Upload copies still running on _IO_POOL, tracked until they finish
+UPLOAD_TIMEOUT_S = 30
+_PENDING_UPLOADS = set()
+_PENDING_UPLOADS_LOCK = threading.Lock()
+
+# qwen3 wraps its reasoning in <think> tags, which are stripped from replies
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+def _json_loads(data):
+    """Parse JSON from str or bytes with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_indented(obj) -> bytes:
+    """Serialise ``obj`` as UTF-8 JSON indented by two spaces."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+# MCP tools published in static/schema.json
+SCHEMA_PATH = Path("static/schema.json")
+MCP_TOOL_NAMES = ("sql", "pdf", "csv")
 
 # Load PDF schema for validation
 PDF_SCHEMA_PATH = Path("static/pdf_schema.json")
-with open(PDF_SCHEMA_PATH, "r", encoding="utf-8") as _f:
-    PDF_SCHEMA = json.load(_f)
+PDF_SCHEMA = _json_loads(PDF_SCHEMA_PATH.read_bytes())
+
+
+# Directories already created by this process
+_DIRS_READY = set()
+
+
+def _ensure_dir(path):
+    """
+    Create ``path`` if needed, at most once per process.
+
+    Args:
+        path: Directory to create
+    """
+    if path in _DIRS_READY:
+        return
+    os.makedirs(path, exist_ok=True)
+    _DIRS_READY.add(path)
+
+
+def _fast_copy(src, dst):
+    """
+    Copy a file's contents and modification time.
+
+    shutil.copyfile copies in the kernel (os.sendfile on Linux, fcopyfile on
+    macOS), and only the mtime is kept, skipping copy2's permission, flag and
+    xattr syscalls.
+
+    Args:
+        src: Path of the file to copy
+        dst: Destination path
+    """
+    shutil.copyfile(src, dst)
+    st = os.stat(src)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _link_or_copy(src, dst):
+    """
+    Hard-link ``src`` to ``dst``, copying only when a link is not possible.
+
+    A hard link shares the data on disk, so nothing is copied when Gradio's
+    temp directory and the uploads directory are on the same filesystem.
+
+    Args:
+        src: Path of the existing file
+        dst: Destination path
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different filesystems (EXDEV) or no hard link support
+        _fast_copy(src, dst)
+
+
+def _persist_uploaded_csv(csv_file, session_id):
+    """
+    Copy an uploaded CSV into the uploads directory and link ./uploaded.csv to it.
+
+    Args:
+        csv_file: Path of the file uploaded through Gradio
+        session_id: Session the upload belongs to
+
+    Returns:
+        str: Path of the copy in the uploads directory
+    """
+    # Use the standard uploads directory from default_paths
+    _ensure_dir(UPLOADS_DIR)
+
+    # Create a unique filename in the uploads directory
+    file_basename = os.path.basename(csv_file)
+    session_path = f"{UPLOADS_DIR}/{session_id[-8:]}_{file_basename}"
+    standard_path = "./uploaded.csv"
+
+    # Remove an existing file/symlink for this session, with one lstat
+    try:
+        st = os.lstat(session_path)
+    except FileNotFoundError:
+        pass
+    else:
+        if stat.S_ISLNK(st.st_mode) or stat.S_ISREG(st.st_mode):
+            os.unlink(session_path)
+
+    # Place the file in the uploads directory (more reliable than symlinks)
+    _link_or_copy(csv_file, session_path)
+
+    # Create symlink for backward compatibility. It is built under a temporary
+    # name and renamed over ./uploaded.csv, so readers never find it missing.
+    tmp_link = f"{standard_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.unlink(tmp_link)
+    except FileNotFoundError:
+        pass
+    try:
+        os.symlink(session_path, tmp_link)
+    except OSError as e:
+        logger.warning("Could not create symlink: %s", e)
+        # On some systems symlinks may fail, so link or copy instead
+        _link_or_copy(session_path, tmp_link)
+    os.replace(tmp_link, standard_path)
+
+    logger.debug("CSV file saved to: %s", session_path)
+    return session_path
+
+
+def _start_upload_persist(csv_file, session_id):
+    """
+    Persist an upload on the I/O pool and track the job until it finishes.
+
+    Args:
+        csv_file: Path of the file uploaded through Gradio
+        session_id: Session the upload belongs to
+
+    Returns:
+        concurrent.futures.Future: The running copy job
+    """
+    future = _IO_POOL.submit(_persist_uploaded_csv, csv_file, session_id)
+    with _PENDING_UPLOADS_LOCK:
+        _PENDING_UPLOADS.add(future)
+    future.add_done_callback(_forget_upload)
+    return future
+
+
+def _forget_upload(future):
+    """Stop tracking a finished upload copy."""
+    with _PENDING_UPLOADS_LOCK:
+        _PENDING_UPLOADS.discard(future)
+
+
+def _wait_for_uploads():
+    """
+    Block until the upload copies in flight have finished.
+
+    Raises:
+        TimeoutError: If a copy is still running after UPLOAD_TIMEOUT_S
+    """
+    with _PENDING_UPLOADS_LOCK:
+        pending = list(_PENDING_UPLOADS)
+    if pending:
+        _, not_done = concurrent.futures.wait(pending, timeout=UPLOAD_TIMEOUT_S)
+        if not_done:
+            raise TimeoutError("The uploaded CSV is still being saved; try again in a moment.")
+
+
+async def _await_upload(upload, csv_file):
+    """
+    Wait for the upload copy started by a chat turn.
+
+    Args:
+        upload: Future returned by _start_upload_persist
+        csv_file: Path of the file uploaded through Gradio
+
+    Returns:
+        Optional[str]: A notice for the user if the copy did not complete
+    """
+    try:
+        # shield keeps the job alive on timeout; it stays tracked in
+        # _PENDING_UPLOADS until the copy finishes
+        await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(upload)), timeout=UPLOAD_TIMEOUT_S
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Upload of %s still copying after %ss", csv_file, UPLOAD_TIMEOUT_S)
+        return (
+            "⏳ Your CSV upload is still being saved, so this answer may not use it. "
+            "Please ask again in a moment."
+        )
+    except Exception as e:
+        logger.error("Error handling uploaded file: %s", e)
+        return f"⚠️ Your CSV upload could not be saved ({e}). Please upload it again."
+    return None
+
+
+def _normalize_pdf_data(data):
+    """
+    Normalise parsed report data into the dictionary create_pdf expects.
+
+    Args:
+        data: Parsed report data (dict, list or any other value)
+
+    Returns:
+        dict: The report data, or an error dict describing why it was rejected
+    """
+    # Handle basic data type conversion
+    if isinstance(data, dict):
+        if "sections" in data:
+            try:
+                validate(instance=data, schema=PDF_SCHEMA)
+            except ValidationError as ve:
+                data = {"error": "Invalid PDF schema", "details": ve.message}
+        return data
+    if isinstance(data, list):
+        # Convert list to simple dictionary with indexed keys
+        return {f"item_{i}": item for i, item in enumerate(data, 1)}
+    # Unsupported type - create error dict
+    return {
+        "error": "Unsupported data type",
+        "received_type": str(type(data)),
+    }
+
+
+def _normalize_pdf_json(data_json: str):
+    """
+    Parse and normalise a JSON report payload, memoised per payload.
+
+    Agents often resend the same payload, so repeated requests skip parsing
+    and schema validation. Each caller gets its own copy of the cached dict,
+    so a change made while building one report cannot leak into the next.
+
+    Args:
+        data_json: JSON string containing the report data
+
+    Returns:
+        dict: The normalised report data
+    """
+    return copy.deepcopy(_parse_pdf_json(data_json))
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_pdf_json(data_json: str):
+    """Parse and normalise a JSON report payload; the result is shared, never mutate it."""
+    try:
+        data = _json_loads(data_json)
+    except Exception:
+        # Handle invalid JSON by creating an error dict
+        return {
+            "error": "Invalid JSON",
+            "raw_input": (
+                data_json[:200] + "..." if len(data_json) > 200 else data_json
+            ),
+        }
+    return _normalize_pdf_data(data)
+
+
+# Generated reports keyed by payload hash and chart flag. Each entry holds the
+# path with its (mtime_ns, size), so a file rewritten since is not reused.
+PDF_CACHE_SIZE = 32
+_PDF_CACHE = OrderedDict()
+# Gradio runs tool calls on several worker threads
+_PDF_CACHE_LOCK = threading.Lock()
+
+
+def _pdf_cache_key(data_json, out_path, include_chart):
+    """
+    Build the report cache key for a PDF request.
+
+    Args:
+        data_json: JSON string or object containing the report data
+        out_path: Requested output path, or None for the default
+        include_chart: Whether a chart was requested
+
+    Returns:
+        Optional[tuple]: The cache key, or None if the request is not cached
+    """
+    # An explicit path may be reused for other data, so only default paths are cached
+    if out_path is not None:
+        return None
+    if isinstance(data_json, str):
+        payload = data_json.encode("utf-8")
+    else:
+        try:
+            payload = _json_dumps_indented(data_json)
+        except (TypeError, ValueError):
+            return None
+    digest = hashlib.blake2b(payload, digest_size=16).digest()
+    return digest, bool(include_chart)
+
+
+def _file_signature(path):
+    """Return (mtime_ns, size) for ``path``, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
 
 def server_status() -> str:
@@ -30,179 +375,133 @@ def server_status() -> str:
     return "✅ MCP Data Assistant server is running."
 
 
-with gr.Blocks() as tools_demo:
-    gr.Markdown("# MCP Data Assistant")
-    gr.Markdown("This server will expose three tools (SQL, CSV summary, PDF report).")
+# Wrapper around create_pdf to ensure data parameter is properly processed
+def create_pdf_wrapper(data_json, out_path=None, include_chart=True):
+    """
+    Generate a professional PDF report from provided data.
+
+    Creates a PDF document with the given data formatted as a table.
+    Optionally includes a bar chart visualization of numeric values.
 
-    # Register MCP tools
-    run_sql_interface = gr.Interface(
-        fn=run_sql,
+    Args:
+        data_json: JSON string or object containing the data to include
+        out_path: Optional custom path for the generated PDF file
+        include_chart: Whether to include a bar chart visualization
+
+    Returns:
+        Absolute path to the generated PDF file
+
+    Raises:
+        ValueError: If the data dictionary is empty
+    """
+    # Debug log (minimal)
+    logger.debug("PDF request received with type: %s", type(data_json))
+    # Retried tool calls resend the same request; reuse the report if it is unchanged
+    key = _pdf_cache_key(data_json, out_path, include_chart)
+    if key is not None:
+        with _PDF_CACHE_LOCK:
+            cached = _PDF_CACHE.get(key)
+            if cached is not None:
+                cached_path, signature = cached
+                if _file_signature(cached_path) == signature:
+                    _PDF_CACHE.move_to_end(key)
+                    return cached_path
+                del _PDF_CACHE[key]
+
+    create_pdf = _resolve("tools.pdf_tool", "create_pdf")
+
+    try:
+        # JSON strings go through the memoised parser, other inputs are normalised directly
+        if isinstance(data_json, str):
+            data = _normalize_pdf_json(data_json)
+        else:
+            data = _normalize_pdf_data(data_json)
+
+        # Create the PDF
+        pdf_path = create_pdf(data, out_path, include_chart)
+        # Error reports (invalid JSON, schema errors) are not cached, so a
+        # corrected retry is never answered with the old error report
+        if "error" in data:
+            key = None
+        signature = _file_signature(pdf_path) if key is not None else None
+        if signature is not None:
+            with _PDF_CACHE_LOCK:
+                _PDF_CACHE[key] = (pdf_path, signature)
+                _PDF_CACHE.move_to_end(key)
+                if len(_PDF_CACHE) > PDF_CACHE_SIZE:
+                    _PDF_CACHE.popitem(last=False)
+        return pdf_path
+
+    except Exception as e:
+        # If PDF creation fails, create an error report
+        try:
+            error_data = {"error": f"Failed to create PDF: {str(e)}"}
+            return create_pdf(error_data, out_path, include_chart=False)
+        except Exception:
+            # Last resort if even the error PDF can't be created
+            return "Critical error creating PDF"
+
+
+def _tool_doc(module, name):
+    """
+    Read a tool function's docstring from its source without importing the module.
+
+    Args:
+        module: Dotted module path
+        name: Name of a top-level function in that module
+
+    Returns:
+        str: The docstring exactly as ``fn.__doc__`` would give it
+    """
+    source = Path(importlib.util.find_spec(module).origin).read_text(encoding="utf-8")
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.FunctionDef) and node.name == name:
+            return ast.get_docstring(node, clean=False)
+    raise LookupError(f"{module}.{name} not found")
+
+
+# SQL and CSV wrappers import pandas/SQLAlchemy tool modules on first call.
+# Gradio builds MCP descriptions from __doc__, so each wrapper takes its tool's
+# docstring from the tool's source.
+def run_sql_wrapper(query: str):
+    return _resolve("tools.sql_tool", "run_sql")(query)
+
+
+def summarise_csv_wrapper(file_input):
+    # Uploads are copied while the agent runs, so wait for them before reading
+    _wait_for_uploads()
+    return _resolve("tools.csv_tool", "summarise_csv")(file_input)
+
+
+run_sql_wrapper.__doc__ = _tool_doc("tools.sql_tool", "run_sql")
+summarise_csv_wrapper.__doc__ = _tool_doc("tools.csv_tool", "summarise_csv")
+
+
+# MCP tool definitions; api_name sets the tool name exposed over MCP
+_TOOLS = [
+    dict(
+        fn=run_sql_wrapper,
         inputs=gr.Textbox(label="SQL Query"),
         outputs=gr.JSON(),
         title="SQL Query Tool",
         description="Execute read-only SQL queries",
         examples=["SELECT 1 AS one"],
         api_name="sql",
-    )
-
-    # REMOVED: csv_handler function - we'll use summarise_csv directly instead
-        
-    # Create a proper Interface for CSV summary tool
-    # This is the primary interface that will be exposed to MCP
-    summarise_csv_interface = gr.Interface(
-        fn=summarise_csv,  # Use the function directly
+    ),
+    dict(
+        fn=summarise_csv_wrapper,
         inputs=gr.Textbox(
-            label="CSV File Path", 
+            label="CSV File Path",
             placeholder="Path to CSV file (e.g., sample_data/people.csv)",
-            value="sample_data/people.csv"
+            value="sample_data/people.csv",
         ),
         outputs=gr.JSON(),
         title="CSV Summary Tool",
         description="Analyze a CSV file and provide summary statistics",
         examples=["sample_data/people.csv"],
-        api_name="csv",  # This sets the name for MCP tool
-    )
-    
-    # Create a user-friendly UI version with upload capability
-    # This won't be exposed to MCP due to the explicit api_name=False
-    with gr.Blocks() as csv_upload_ui:
-        gr.Markdown("## CSV Upload & Analysis")
-        
-        with gr.Tabs():
-            with gr.TabItem("Upload CSV"):
-                # File upload
-                file_upload = gr.File(
-                    label="Upload a CSV file",
-                    file_types=[".csv"],
-                    type="filepath"
-                )
-                
-                # Process uploaded file function
-                def process_upload(file):
-                    if file is None:
-                        return {"error": "No file uploaded"}
-                    try:
-                        return summarise_csv(file)
-                    except Exception as e:
-                        return {"error": str(e)}
-                
-                # Hide function from MCP
-                process_upload._hide_from_mcp = True
-                
-                # UI components
-                upload_button = gr.Button("Analyze CSV")
-                upload_output = gr.JSON()
-                
-                # Connect with api_name=False to hide from MCP
-                upload_button.click(
-                    fn=process_upload, 
-                    inputs=file_upload, 
-                    outputs=upload_output,
-                    api_name=False
-                )
-                
-            with gr.TabItem("File Path"):
-                # Path input
-                path_input = gr.Textbox(
-                    label="CSV File Path",
-                    placeholder="Enter path to a CSV file (e.g., sample_data/people.csv)",
-                    value="sample_data/people.csv"
-                )
-                
-                # Process path function
-                def process_path(path):
-                    if not path or not path.strip():
-                        return {"error": "No path provided"}
-                    try:
-                        return summarise_csv(path)
-                    except Exception as e:
-                        return {"error": str(e)}
-                
-                # Hide function from MCP
-                process_path._hide_from_mcp = True
-                
-                # UI components
-                path_button = gr.Button("Analyze CSV")
-                path_output = gr.JSON()
-                
-                # Connect with api_name=False to hide from MCP
-                path_button.click(
-                    fn=process_path, 
-                    inputs=path_input, 
-                    outputs=path_output,
-                    api_name=False
-                )
-
-    # Wrapper around create_pdf to ensure data parameter is properly processed
-    def create_pdf_wrapper(data_json, out_path=None, include_chart=True):
-        """
-        Generate a professional PDF report from provided data.
-
-        Creates a PDF document with the given data formatted as a table.
-        Optionally includes a bar chart visualization of numeric values.
-
-        Args:
-            data_json: JSON string or object containing the data to include
-            out_path: Optional custom path for the generated PDF file
-            include_chart: Whether to include a bar chart visualization
-
-        Returns:
-            Absolute path to the generated PDF file
-
-        Raises:
-            ValueError: If the data dictionary is empty
-        """
-        # Debug log (minimal)
-        print(f"PDF request received with type: {type(data_json)}")
-
-        # Parse JSON string to dict if needed
-        if isinstance(data_json, str):
-            try:
-                data = json.loads(data_json)
-            except Exception:
-                # Handle invalid JSON by creating an error dict
-                data = {
-                    "error": "Invalid JSON",
-                    "raw_input": (
-                        data_json[:200] + "..." if len(data_json) > 200 else data_json
-                    ),
-                }
-        else:
-            data = data_json
-
-        try:
-            # Handle basic data type conversion
-            if isinstance(data, dict):
-                if "sections" in data:
-                    try:
-                        validate(instance=data, schema=PDF_SCHEMA)
-                    except ValidationError as ve:
-                        data = {"error": "Invalid PDF schema", "details": ve.message}
-                pass
-            elif isinstance(data, list):
-                # Convert list to simple dictionary with indexed keys
-                items = {"item_" + str(i + 1): item for i, item in enumerate(data)}
-                data = items
-            else:
-                # Unsupported type - create error dict
-                data = {
-                    "error": "Unsupported data type",
-                    "received_type": str(type(data)),
-                }
-
-            # Create the PDF
-            return create_pdf(data, out_path, include_chart)
-
-        except Exception as e:
-            # If PDF creation fails, create an error report
-            try:
-                error_data = {"error": f"Failed to create PDF: {str(e)}"}
-                return create_pdf(error_data, out_path, include_chart=False)
-            except Exception:
-                # Last resort if even the error PDF can't be created
-                return "Critical error creating PDF"
-
-    create_pdf_interface = gr.Interface(
+        api_name="csv",
+    ),
+    dict(
         fn=create_pdf_wrapper,
         inputs=[
             gr.Textbox(
@@ -219,7 +518,16 @@ with gr.Blocks() as tools_demo:
         description="Create professional PDF reports with data and optional charts",
         examples=[['{"customer": "ACME", "total": 999}', None, True]],
         api_name="pdf",
-    )
+    ),
+]
+
+
+with gr.Blocks() as tools_demo:
+    gr.Markdown("# MCP Data Assistant")
+    gr.Markdown("This server will expose three tools (SQL, CSV summary, PDF report).")
+
+    # Register MCP tools, one Interface per entry in _TOOLS
+    tool_interfaces = {spec["api_name"]: gr.Interface(**spec) for spec in _TOOLS}
 
     # Add simple UI components
     status_btn = gr.Button("Ping server")
@@ -228,6 +536,117 @@ with gr.Blocks() as tools_demo:
     status_btn.click(server_status, outputs=status_output, api_name=False)
 
 
+# Create a user-friendly UI version with upload capability
+# This won't be exposed to MCP due to the explicit api_name=False.
+# It has its own tab, so it is not nested in tools_demo as well.
+with gr.Blocks() as csv_upload_ui:
+    gr.Markdown("## CSV Upload & Analysis")
+
+    with gr.Tabs():
+        with gr.TabItem("Upload CSV"):
+            # File upload
+            file_upload = gr.File(
+                label="Upload a CSV file",
+                file_types=[".csv"],
+                type="filepath"
+            )
+
+            # Process uploaded file function
+            def process_upload(file):
+                if file is None:
+                    return {"error": "No file uploaded"}
+                try:
+                    return summarise_csv_wrapper(file)
+                except Exception as e:
+                    return {"error": str(e)}
+
+            # Hide function from MCP
+            process_upload._hide_from_mcp = True
+
+            # UI components
+            upload_button = gr.Button("Analyze CSV")
+            upload_output = gr.JSON()
+
+            # Connect with api_name=False to hide from MCP
+            upload_button.click(
+                fn=process_upload, 
+                inputs=file_upload, 
+                outputs=upload_output,
+                api_name=False
+            )
+
+        with gr.TabItem("File Path"):
+            # Path input
+            path_input = gr.Textbox(
+                label="CSV File Path",
+                placeholder="Enter path to a CSV file (e.g., sample_data/people.csv)",
+                value="sample_data/people.csv"
+            )
+
+            # Process path function
+            def process_path(path):
+                if not path or not path.strip():
+                    return {"error": "No path provided"}
+                try:
+                    return summarise_csv_wrapper(path)
+                except Exception as e:
+                    return {"error": str(e)}
+
+            # Hide function from MCP
+            process_path._hide_from_mcp = True
+
+            # UI components
+            path_button = gr.Button("Analyze CSV")
+            path_output = gr.JSON()
+
+            # Connect with api_name=False to hide from MCP
+            path_button.click(
+                fn=process_path, 
+                inputs=path_input, 
+                outputs=path_output,
+                api_name=False
+            )
+
+
+def _render_indicator(background, border, color, text):
+    """Render the model indicator box with the given colours and label."""
+    return f"""<div style='padding: 8px; border-radius: 4px;
+        background-color: {background};
+        border: 1px solid {border};
+        color: {color};
+        font-weight: bold;
+        margin-top: 8px;'>
+        {text}</div>"""
+
+
+# The model indicator only ever shows one of these three states
+_INDICATOR_HTML = {
+    "openai": _render_indicator("#e6ffe6", "#52c41a", "#135200", "☁️ Using OpenAI API (Cloud)"),
+    "local_ok": _render_indicator("#e6f7ff", "#91caff", "#0050b3", "🖥️ Using Local Model (qwen3:8b)"),
+    "local_missing": _render_indicator(
+        "#e6f7ff", "#91caff", "#0050b3", "🖥️ Using Local Model (qwen3:8b) - ⚠️ Ollama Not Available"
+    ),
+}
+
+
+def _indicator_html(model, ollama_available=None):
+    """
+    Return the indicator HTML for the selected model.
+
+    Args:
+        model: The selected model choice
+        ollama_available: Known Ollama status; probed when None and the local model is selected
+
+    Returns:
+        str: The precomputed indicator HTML
+    """
+    if model != "Local (qwen3:8b)":
+        return _INDICATOR_HTML["openai"]
+    if ollama_available is None:
+        ollama_available = _check_ollama_available()
+    return _INDICATOR_HTML["local_ok" if ollama_available else "local_missing"]
+
+
 # Model selector component
 with gr.Blocks() as llm_selector:
     gr.Markdown("## Model Selection")
@@ -247,32 +666,12 @@ with gr.Blocks() as llm_selector:
     )
 
     # Add visual indicator for active model
-    model_indicator = gr.Markdown(
-        value=f"""<div style='padding: 8px; border-radius: 4px;
-        background-color: {'#e6f7ff' if default_model == 'Local (qwen3:8b)' else '#e6ffe6'};
-        border: 1px solid {'#91caff' if default_model == 'Local (qwen3:8b)' else '#52c41a'};
-        color: {'#0050b3' if default_model == 'Local (qwen3:8b)' else '#135200'};
-        font-weight: bold;
-        margin-top: 8px;'>
-        {'🖥️ Using Local Model (qwen3:8b)' + (' - Ollama Not Available' if not ollama_available else '')
-        if default_model == 'Local (qwen3:8b)' else '☁️ Using OpenAI API (Cloud)'}</div>"""
-    )
+    model_indicator = gr.Markdown(value=_indicator_html(default_model, ollama_available))
 
     # Update indicator on model change
     def update_indicator(model):
-        ollama_status = _check_ollama_available()
-        local_text = "🖥️ Using Local Model (qwen3:8b)"
-        if model == "Local (qwen3:8b)" and not ollama_status:
-            local_text += " - ⚠️ Ollama Not Available"
-
-        return f"""<div style='padding: 8px; border-radius: 4px;
-        background-color: {'#e6f7ff' if model == 'Local (qwen3:8b)' else '#e6ffe6'};
-        border: 1px solid {'#91caff' if model == 'Local (qwen3:8b)' else '#52c41a'};
-        color: {'#0050b3' if model == 'Local (qwen3:8b)' else '#135200'};
-        font-weight: bold;
-        margin-top: 8px;'>
-        {local_text if model == 'Local (qwen3:8b)' else '☁️ Using OpenAI API (Cloud)'}</div>"""
-    
+        return _indicator_html(model)
+
     # Hide this function from MCP
     update_indicator._hide_from_mcp = True
     
@@ -321,7 +720,7 @@ with gr.Blocks() as assistant_chat:
     clear = gr.Button("Clear")
 
     # Define the respond function - simplified approach
-    def respond(message, history, model_choice, csv_file, session_id=None, prev_result=None):
+    async def respond(message, history, model_choice, csv_file, session_id=None, prev_result=None):
         """Chat response function for the assistant.
         
         This function uses LLM (OpenAI or Ollama) to respond to user messages and integrates
@@ -337,88 +736,74 @@ with gr.Blocks() as assistant_chat:
         """
         # Create a session ID if None
         if not session_id:
-            session_id = str(uuid.uuid4())
-            print(f"Created new session: {session_id}")
+            session_id = session_manager.create_session()
+            logger.debug("Created new session: %s", session_id)
         else:
-            print(f"Using existing session: {session_id}")
-            print(f"Gradio history has {len(history)} messages")
+            # Recreate the session if it was evicted; the upload below is then
+            # registered again because the new session has no CSV yet
+            session_manager.ensure_session(session_id)
+            logger.debug("Using existing session %s (%d messages)", session_id, len(history))
             
         # Log if we have a previous result object
-        if prev_result:
-            print("Using previous result object for conversation continuity")
-        else:
-            print("No previous result object available")
+        logger.debug("Previous result object available: %s", prev_result is not None)
             
         provider = "ollama" if model_choice == "Local (qwen3:8b)" else "openai"
         
-        # If a CSV file is uploaded, register it with the session
-        if csv_file:
-            # Log the uploaded file
-            print(f"DEBUG - CSV file has been uploaded: {csv_file}")
-            
+        # If a new CSV file is uploaded, register it with the session. The upload
+        # widget resends the same path every turn, which needs no further work.
+        upload = None
+        if csv_file and session_manager.get_file(session_id, "csv") != csv_file:
             # Register the file with the session manager
             session_manager.register_file(session_id, "csv", csv_file)
-            print(f"Registered CSV file with session {session_id}: {csv_file}")
+            logger.debug("Registered CSV file with session %s: %s", session_id, csv_file)
             
-            # Create symbolic links in standard locations for compatibility
-            try:
-                # Use the standard uploads directory from default_paths
-                os.makedirs(UPLOADS_DIR, exist_ok=True)
-                
-                # Create a unique filename in the uploads directory
-                file_basename = os.path.basename(csv_file)
-                session_path = f"{UPLOADS_DIR}/{session_id[-8:]}_{file_basename}"
-                standard_path = "./uploaded.csv"
-                
-                # Remove existing files/symlinks if they exist
-                for path in [session_path, standard_path]:
-                    if os.path.exists(path):
-                        if os.path.islink(path):
-                            os.remove(path)
-                        elif os.path.isfile(path):
-                            os.remove(path)
-                
-                # Copy the file to the uploads directory (more reliable than symlinks)
-                shutil.copy2(csv_file, session_path)
-                
-                # Create symlink for backward compatibility
-                try:
-                    os.symlink(session_path, standard_path)
-                except OSError as e:
-                    print(f"Warning: Could not create symlink: {e}")
-                    # On some systems symlinks may fail, so create a copy instead
-                    shutil.copy2(session_path, standard_path)
-                
-                print(f"CSV file saved to: {session_path}")
-                # The agent will automatically find the file in the uploads directory
-            except Exception as e:
-                print(f"Error handling uploaded file: {str(e)}")
+            # Files already in the uploads directory need no copy. Others are
+            # persisted on the I/O pool while the agent runs; the csv tool waits
+            # for the copy before it opens "uploaded.csv"
+            uploads_root = os.path.abspath(UPLOADS_DIR) + os.sep
+            if not os.path.abspath(csv_file).startswith(uploads_root):
+                upload = _start_upload_persist(csv_file, session_id)
         
-        # Get the response from the assistant with session context
-        response, new_result = answer(
+        # Get the response from the assistant with session context; answer()
+        # blocks, so it runs in a worker thread while the event loop stays free
+        reply = asyncio.to_thread(
+            answer,
             prompt=message, 
             provider=provider, 
             session_id=session_id,
             prev_result=prev_result
         )
-        
-        # DEBUG - Log the response type and content
-        print(f"DEBUG - Response type: {type(response)}")
-        print(f"DEBUG - Response content length: {len(response) if isinstance(response, str) else 'not a string'}")
-        prefix = response[:100] if isinstance(response, str) else 'not a string'
-        print(f"DEBUG - Response content starts with: {prefix}")
+        if upload is None:
+            response, new_result = await reply
+        else:
+            (response, new_result), notice = await asyncio.gather(
+                reply, _await_upload(upload, csv_file)
+            )
+            if notice is not None:
+                response = f"{response}\n\n{notice}"
+
+        # Log the response type and content
+        if logger.isEnabledFor(logging.DEBUG):
+            is_str = isinstance(response, str)
+            logger.debug(
+                "Response type: %s, length: %s, starts with: %s",
+                type(response),
+                len(response) if is_str else "not a string",
+                response[:100] if is_str else "not a string",
+            )
 
         # Nettoyage des balises <think> dans la réponse pour qwen3:8b
         if isinstance(response, str) and "<think>" in response:
             # Supprimer les balises think et leur contenu
-            import re
-            cleaned_response = re.sub(r'<think>.*?</think>', '', response, flags=re.DOTALL).strip()
-            print(f"DEBUG - Cleaned response: {cleaned_response[:100]}")
+            cleaned_response = _THINK_RE.sub("", response).strip()
+            logger.debug("Cleaned response: %.100s", cleaned_response)
             response = cleaned_response
 
         # Return the result as messages with role/content format for display
-        history.append({"role": "user", "content": message})
-        history.append({"role": "assistant", "content": response})
+        history.extend((
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response},
+        ))
 
         # Return updated history, persist session ID, and the result object for next call
         return "", history, session_id, new_result
@@ -444,7 +829,7 @@ with gr.Blocks() as assistant_chat:
         """Clear the chat history by creating a new session."""
         # Simplement créer une nouvelle session, toujours vide et propre
         new_session_id = session_manager.create_session()
-        print(f"Créé une nouvelle session: {new_session_id}")
+        logger.debug("Créé une nouvelle session: %s", new_session_id)
 
         # Effacer l'historique visuel
         empty_history = []
@@ -466,11 +851,48 @@ with gr.Blocks() as assistant_chat:
 
 
 # ---------- Tabs UI -----------------
-demo = gr.TabbedInterface(
-    [tools_demo, csv_upload_ui, assistant_chat],
-    ["Tools API", "CSV Upload & Analysis", "Assistant"],
-    title="NeurArk MCP Data Assistant",
-)
+# Each sub-app is rendered once, into its own tab
+with gr.Blocks(title="NeurArk MCP Data Assistant") as demo:
+    gr.Markdown(
+        "<h1 style='text-align: center; margin-bottom: 1rem'>NeurArk MCP Data Assistant</h1>"
+    )
+    with gr.Tabs():
+        with gr.Tab("Tools API", id="tools"):
+            tools_demo.render()
+        with gr.Tab("CSV Upload & Analysis", id="csv"):
+            csv_upload_ui.render()
+        with gr.Tab("Assistant", id="assistant"):
+            assistant_chat.render()
+
+
+def save_mcp_schema(mcp_server_obj, path=SCHEMA_PATH):
+    """
+    Write the MCP tool schemas to static/schema.json.
+
+    The schemas come from the in-process Gradio MCP server, so no HTTP
+    request to the running app is needed. The file is only rewritten
+    when its content changes.
+
+    Args:
+        mcp_server_obj: The app's GradioMCPServer (``demo.mcp_server_obj``)
+        path: Destination of the schema file
+    """
+    response = asyncio.run(mcp_server_obj.get_complete_schema(None))
+    schemas = _json_loads(response.body)
+    filtered = {name: schemas[name] for name in MCP_TOOL_NAMES if name in schemas}
+    payload = _json_dumps_indented(filtered)
+
+    # The schema rarely changes between launches; leave an identical file alone
+    try:
+        if Path(path).read_bytes() == payload:
+            print(f"MCP schema unchanged: {path}")
+            return
+    except FileNotFoundError:
+        pass
+
+    with open(path, "wb") as f:
+        f.write(payload)
+    print(f"MCP schema saved to: {path}")
 
 
 # Function to check temp directory access - not used for MCP
@@ -481,8 +903,8 @@ def check_temp_directory_access():
     gradio_temp = os.path.join(temp_dir, "gradio")
     
     # Ensure standard directories exist
-    os.makedirs(UPLOADS_DIR, exist_ok=True)
-    os.makedirs(DATA_DIR, exist_ok=True)
+    _ensure_dir(UPLOADS_DIR)
+    _ensure_dir(DATA_DIR)
     
     # Get absolute paths for proper environment variable setting
     cwd = os.getcwd()
@@ -504,18 +926,20 @@ def check_temp_directory_access():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+
     # Configure access to temporary and data directories
     temp_dir = check_temp_directory_access()
     
     # Ensure all data directories exist
     for directory in [DATA_DIR, UPLOADS_DIR]:
-        os.makedirs(directory, exist_ok=True)
+        _ensure_dir(directory)
         print(f"Ensuring directory exists: {directory}")
     
     print("Starting MCP server...")
     
     # Enable MCP server for LLM tools access with allowed_paths configuration
-    # In Gradio 5.29, launch the server in a blocking way (default)
+    # Launch without blocking so the MCP server object can be wired up below
     demo.launch(
         mcp_server=True,  # Enable MCP to expose tools to LLMs
         share=False,      # Don't create a public link
@@ -527,7 +951,23 @@ if __name__ == "__main__":
             "."           # Allow access to current directory for uploaded.csv symlink
         ],  # Allow access to standard directories
         # No need to manipulate the schema - Gradio handles this automatically
+        prevent_thread_lock=True,
     )
 
-    # This code will never be reached because launch() is blocking
+    # The assistant runs in this process, so it can skip HTTP and call the
+    # MCP server object directly
+    mcp_server_obj = getattr(demo, "mcp_server_obj", None)
+    if MCP_TRANSPORT == "inmemory" and mcp_server_obj is not None:
+        use_inmemory_mcp(mcp_server_obj.mcp_server)
+        print("Assistant uses the in-memory MCP transport")
+
+    # Export the tool schemas straight from the running app
+    if mcp_server_obj is not None:
+        try:
+            save_mcp_schema(mcp_server_obj)
+        except Exception as e:
+            print(f"Warning: could not save MCP schema: {e}")
+
+    # Block until the server is interrupted
+    demo.block_thread()
     print("Server stopped.")
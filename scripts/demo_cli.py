@@ -2,7 +2,6 @@
 import os
 import sys
 import time
-import traceback
 import logging
 from pathlib import Path
 
@@ -19,6 +18,20 @@ logging.basicConfig(
 logger = logging.getLogger("demo_cli")
 
 
+def _list_pdfs(directory):
+    """Map each PDF path in ``directory`` to its (mtime, size), with one stat per file."""
+    pdfs = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pdf") and entry.is_file():
+                    st = entry.stat()
+                    pdfs[entry.path] = (st.st_mtime, st.st_size)
+    except FileNotFoundError:
+        pass
+    return pdfs
+
+
 def main():
     from agent import answer
     import argparse
@@ -42,15 +55,19 @@ def main():
     print("USER:", prompt)
 
     try:
+        # The report scans only feed INFO logs, so skip them when INFO is off
+        log_reports = logger.isEnabledFor(logging.INFO)
+
         # Check reports folder state before
         reports_dir = parent_dir / "reports"
-        before_files = list(reports_dir.glob("*.pdf"))
-        logger.info(f"PDF files before: {len(before_files)}")
-        if before_files:
-            logger.info(
-                f"Latest PDF before: "
-                f"{max(before_files, key=lambda p: p.stat().st_mtime)}"
-            )
+        before_files = _list_pdfs(reports_dir) if log_reports else {}
+        if log_reports:
+            logger.info("PDF files before: %d", len(before_files))
+            if before_files:
+                logger.info(
+                    "Latest PDF before: %s",
+                    max(before_files, key=lambda p: before_files[p][0]),
+                )
 
         # Execute the agent with the specified provider
         logger.info("Calling agent...")
@@ -58,31 +75,32 @@ def main():
         print("ASSISTANT:", response)
 
         # Check reports folder state after
-        after_files = list(reports_dir.glob("*.pdf"))
-        logger.info(f"PDF files after: {len(after_files)}")
+        after_files = _list_pdfs(reports_dir) if log_reports else {}
+        if log_reports:
+            logger.info("PDF files after: %d", len(after_files))
         if after_files:
-            latest = max(after_files, key=lambda p: p.stat().st_mtime)
-            logger.info(f"Latest PDF after: {latest}")
+            latest = max(after_files, key=lambda p: after_files[p][0])
+            latest_mtime, latest_size = after_files[latest]
+            logger.info("Latest PDF after: %s", latest)
 
             # Check if new files were created
             new_files = [f for f in after_files if f not in before_files]
             if new_files:
-                logger.info(f"New PDF files created: {new_files}")
+                logger.info("New PDF files created: %s", new_files)
 
                 # Check size and age of latest file
-                latest_age = os.path.getmtime(latest) - time.time()
                 logger.info(
-                    f"Latest PDF age: {latest_age:.1f}s, "
-                    f"size: {latest.stat().st_size} bytes"
+                    "Latest PDF age: %.1fs, size: %d bytes",
+                    latest_mtime - time.time(),
+                    latest_size,
                 )
 
     except Exception as e:
-        logger.error(f"Error in demo_cli: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.error("Error in demo_cli: %s", e, exc_info=True)
         print("ASSISTANT: An error occurred processing your request.")
 
 
 if __name__ == "__main__":
     start_time = time.time()
     main()
-    logger.info(f"Total execution time: {time.time() - start_time:.2f}s")
+    logger.info("Total execution time: %.2fs", time.time() - start_time)
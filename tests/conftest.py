@@ -2,18 +2,85 @@ import warnings
 from _pytest.runner import runtestprotocol
 import asyncio
 import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import weakref
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+import pytest
+
+# Address of the app started by the gradio_server fixture
+GRADIO_URL = "http://127.0.0.1:7860"
+
+# httpx.AsyncClient instances created during the run, closed after each test
+_async_clients = weakref.WeakSet()
+
+# Event loop reused for closing clients, created on first need
+_cleanup_loop = None
+
+
+def _track_async_clients():
+    """Record every httpx.AsyncClient as it is created."""
+    try:
+        import httpx
+    except ImportError:
+        return
+
+    original_init = httpx.AsyncClient.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        _async_clients.add(self)
+
+    httpx.AsyncClient.__init__ = tracking_init
+
+
+# Module-level pooled clients that live for the whole process, as (module, attribute)
+_CACHED_CLIENT_OWNERS = (
+    ("agent.ollama_integration", "_ollama_client"),
+    ("agent.assistant", "_openai_client"),
+)
+
+
+def _cached_client_ids():
+    """ids of the httpx clients held by module-level caches, which outlive a test."""
+    ids = set()
+    for module, attr in _CACHED_CLIENT_OWNERS:
+        owner = getattr(sys.modules.get(module), attr, None)
+        http_client = getattr(owner, "_client", None)
+        if http_client is not None:
+            ids.add(id(http_client))
+    return ids
+
+
+async def _close_clients(clients):
+    """Close several httpx clients concurrently, ignoring individual failures."""
+    await asyncio.gather(
+        *(client.aclose() for client in clients), return_exceptions=True
+    )
+
 
 def pytest_configure(config):
     """Register custom marks and configure test environment."""
     config.addinivalue_line(
         "markers", "integration: mark a test as an integration test"
     )
+    config.addinivalue_line(
+        "markers", "live: mark a test as calling the real OpenAI API"
+    )
 
     # Completely disable all coroutine warnings
     warnings.filterwarnings("ignore",
                           message="coroutine '.*' was never awaited",
                           category=RuntimeWarning)
 
+    _track_async_clients()
+
 # Add a hook to run after each test to ensure no warnings are shown
 def pytest_runtest_protocol(item, nextitem):
     # Run the standard test protocol
@@ -21,8 +88,9 @@ def pytest_runtest_protocol(item, nextitem):
 
     # Clean up any pending tasks that might cause warnings
 
-    # Force garbage collection to clean up unattended coroutines
-    gc.collect()
+    # Collect unattended coroutines only when there are clients to clean up
+    if _async_clients:
+        gc.collect()
 
     # Try to cancel any pending tasks
     try:
@@ -55,21 +123,122 @@ def pytest_runtest_protocol(item, nextitem):
         pass
 
     # Clean up httpx related resources
-    try:
-        # Explicitly clean up any httpx resources
-        import httpx
-        for client in gc.get_objects():
-            if isinstance(client, httpx.AsyncClient):
-                try:
-                    # Create a new event loop just to close the client
-                    temp_loop = asyncio.new_event_loop()
-                    temp_loop.run_until_complete(client.aclose())
-                    temp_loop.close()
-                except Exception:
-                    # Ignore errors during cleanup
-                    pass
-    except Exception:
-        # Ignore import or other errors
-        pass
+    global _cleanup_loop
+    # Cached clients are reused by later tests, so they are left open
+    cached = _cached_client_ids()
+    to_close = [
+        client for client in _async_clients
+        if not client.is_closed and id(client) not in cached
+    ]
+    _async_clients.clear()
+    if to_close:
+        if _cleanup_loop is None:
+            _cleanup_loop = asyncio.new_event_loop()
+        try:
+            # Close every client in one pass on the shared cleanup loop
+            _cleanup_loop.run_until_complete(_close_clients(to_close))
+        except Exception:
+            # Ignore errors during cleanup
+            pass
 
     return reports
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Close the shared client cleanup loop."""
+    global _cleanup_loop
+    if _cleanup_loop is not None:
+        _cleanup_loop.close()
+        _cleanup_loop = None
+
+
+def wait_until_ready(url: str, timeout=20):
+    deadline = time.monotonic() + timeout
+    delay = 0.025
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url, timeout=1):
+                return True
+        except HTTPError:
+            # Any HTTP response means the server is up
+            return True
+        except (URLError, OSError):
+            # Start polling fast and back off gently, so readiness is seen within 250 ms
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 1.5, 0.25)
+    return False
+
+
+@pytest.fixture(scope="session")
+def reports_dir(tmp_path_factory):
+    """Directory that reports generated during the session are written to."""
+    return tmp_path_factory.mktemp("reports")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolated_reports(reports_dir):
+    """Keep generated reports out of the repository's reports/ folder."""
+    with pytest.MonkeyPatch.context() as mp:
+        # Picked up by tools.pdf_tool when it is imported later in the session
+        mp.setenv("REPORT_DIR", str(reports_dir))
+        pdf_tool = sys.modules.get("tools.pdf_tool")
+        if pdf_tool is not None:
+            mp.setattr(pdf_tool, "REPORT_DIR", reports_dir)
+        yield
+
+
+@pytest.fixture(scope="session")
+def gradio_server(reports_dir):
+    """Start app.py once per test session and yield its URL."""
+    # Start the app in a subprocess; its output goes to a temp file that is
+    # only read if startup fails
+    cwd = Path(__file__).parent.parent
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(
+        [sys.executable, str(cwd / "app.py")],
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        cwd=str(cwd),
+        env={**os.environ, "REPORT_DIR": str(reports_dir)},
+    )
+    try:
+        # Wait for server to start
+        if not wait_until_ready(GRADIO_URL):
+            # If server didn't start, capture output to help debug
+            proc.kill()
+            proc.wait(timeout=5)
+            log.seek(0)
+            output = log.read().decode("utf-8", errors="replace")
+            pytest.fail(f"Server did not start in time. OUTPUT: {output}")
+
+        yield GRADIO_URL
+    finally:
+        # Clean up, killing the server if it ignores SIGTERM
+        if proc.poll() is None:
+            proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        log.close()
+
+
+@pytest.fixture(scope="session")
+def client(gradio_server):
+    """Gradio API client for the session-wide app, connected once."""
+    from gradio_client import Client
+
+    return Client(gradio_server)
+
+
+@pytest.fixture(scope="session")
+def warm_pdf():
+    """Pay the ReportLab/matplotlib import and first-figure cost once per session."""
+    import matplotlib.pyplot as plt
+    from tools import pdf_tool
+
+    plt.close(plt.figure())
+    logo = Path(__file__).parent.parent / "assets" / "logo.png"
+    if logo.exists():
+        pdf_tool._image_bytes(str(logo), logo.stat().st_mtime_ns)
@@ -0,0 +1,14 @@
+import mmap
+from pathlib import Path
+
+
+def count_markers(pdf_path: Path, needle: bytes) -> int:
+    """Count occurrences of needle in the raw PDF bytes."""
+    # Search a read-only mapping so the PDF is never copied into a bytes object;
+    # mmap objects have no count(), so step through it with find()
+    with open(pdf_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        count, pos = 0, m.find(needle)
+        while pos != -1:
+            count += 1
+            pos = m.find(needle, pos + 1)
+        return count
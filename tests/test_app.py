@@ -0,0 +1,133 @@
+import asyncio
+import concurrent.futures
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from unittest.mock import MagicMock
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def fake_create_pdf(monkeypatch, tmp_path):
+    """Count create_pdf calls; each writes a new report under tmp_path."""
+    calls = []
+    counter = itertools.count()
+
+    def create_pdf(data, out_path=None, include_chart=True):
+        calls.append(data)
+        path = out_path or tmp_path / f"report-{next(counter)}.pdf"
+        path = str(path)
+        with open(path, "w") as f:
+            f.write(f"report for {data}")
+        return path
+
+    monkeypatch.setattr(app, "_PDF_CACHE", OrderedDict())
+    monkeypatch.setattr(app, "_resolve", lambda module, name: create_pdf)
+    return calls
+
+
+PAYLOAD = '{"title": "Sales", "grand_total": 10}'
+
+
+def test_repeated_pdf_request_reuses_report(fake_create_pdf):
+    first = app.create_pdf_wrapper(PAYLOAD)
+    second = app.create_pdf_wrapper(PAYLOAD)
+    assert second == first
+    assert len(fake_create_pdf) == 1
+
+
+def test_rewritten_report_is_not_reused(fake_create_pdf):
+    """A cached path whose file changed since is regenerated."""
+    first = app.create_pdf_wrapper(PAYLOAD)
+    with open(first, "w") as f:
+        f.write("a different report that reused this file name")
+    second = app.create_pdf_wrapper(PAYLOAD)
+    assert len(fake_create_pdf) == 2
+    assert second != first
+
+
+def test_explicit_out_path_bypasses_cache(fake_create_pdf, tmp_path):
+    out_path = str(tmp_path / "chosen.pdf")
+    app.create_pdf_wrapper(PAYLOAD, out_path=out_path)
+    app.create_pdf_wrapper(PAYLOAD, out_path=out_path)
+    assert len(fake_create_pdf) == 2
+    assert not app._PDF_CACHE
+
+
+@pytest.mark.parametrize("payload", ["not json at all", '{"title": 5, "sections": []}'])
+def test_error_reports_are_not_cached(fake_create_pdf, payload):
+    """Invalid JSON and schema errors are reported afresh every time."""
+    app.create_pdf_wrapper(payload)
+    app.create_pdf_wrapper(payload)
+    assert "error" in fake_create_pdf[0]
+    assert len(fake_create_pdf) == 2
+    assert not app._PDF_CACHE
+
+
+def test_parsed_pdf_payload_is_not_shared_between_calls():
+    """Mutating one parsed report leaves the memoised payload intact."""
+    first = app._normalize_pdf_json(PAYLOAD)
+    first["title"] = "Changed"
+    assert app._normalize_pdf_json(PAYLOAD)["title"] == "Sales"
+
+
+def test_tool_wrappers_share_tool_docstrings():
+    """MCP descriptions come from the tools' own docstrings."""
+    from tools.csv_tool import summarise_csv
+    from tools.sql_tool import run_sql
+
+    assert app.run_sql_wrapper.__doc__ == run_sql.__doc__
+    assert app.summarise_csv_wrapper.__doc__ == summarise_csv.__doc__
+
+
+def test_upload_still_copying_is_reported(monkeypatch, tmp_path):
+    """The agent runs alongside the copy; one that outlasts the timeout is reported and stays tracked."""
+    release = threading.Event()
+    monkeypatch.setattr(app, "_persist_uploaded_csv", lambda csv_file, session_id: release.wait(5))
+    monkeypatch.setattr(app, "UPLOAD_TIMEOUT_S", 0.05)
+    agent = MagicMock(return_value=("Here is the summary.", None))
+    monkeypatch.setattr(app, "answer", agent)
+    csv_file = tmp_path / "data.csv"
+    csv_file.write_text("a\n1\n")
+
+    _, history, session_id, _ = asyncio.run(
+        app.respond("Summarise it", [], "OpenAI", str(csv_file))
+    )
+    try:
+        agent.assert_called_once()
+        reply = history[-1]["content"]
+        assert reply.startswith("Here is the summary.")
+        assert "still being saved" in reply
+        pending = list(app._PENDING_UPLOADS)
+        assert len(pending) == 1
+        release.set()
+        concurrent.futures.wait(pending, timeout=5)
+        # Done callbacks run just after waiters wake up
+        deadline = time.monotonic() + 5
+        while app._PENDING_UPLOADS and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not app._PENDING_UPLOADS
+    finally:
+        release.set()
+        app.session_manager.delete_session(session_id)
+
+
+def test_csv_tool_waits_for_upload_copy(monkeypatch):
+    """The csv tool never reads uploaded.csv while a copy is in flight."""
+    release = threading.Event()
+    monkeypatch.setattr(app, "_persist_uploaded_csv", lambda csv_file, session_id: release.wait(5))
+    monkeypatch.setattr(app, "UPLOAD_TIMEOUT_S", 0.05)
+    monkeypatch.setattr(app, "_resolve", lambda module, name: lambda file_input: {"file": file_input})
+
+    upload = app._start_upload_persist("data.csv", "session")
+    try:
+        with pytest.raises(TimeoutError):
+            app.summarise_csv_wrapper("uploaded.csv")
+    finally:
+        release.set()
+    upload.result(timeout=5)
+    assert app.summarise_csv_wrapper("uploaded.csv") == {"file": "uploaded.csv"}
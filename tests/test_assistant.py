@@ -0,0 +1,415 @@
+import asyncio
+from collections import OrderedDict
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from agent import assistant, session_manager
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache(monkeypatch):
+    """Start every test with an empty response cache."""
+    monkeypatch.setattr(assistant, "_RESP_CACHE", OrderedDict())
+
+
+@pytest.fixture
+def fake_mcp(monkeypatch):
+    """Replace the MCP connection with a counter that never touches the network."""
+    calls = []
+
+    async def fake_connect():
+        calls.append(1)
+        assistant.mcp_server.session = object()
+
+    monkeypatch.setattr(assistant.mcp_server, "session", None)
+    monkeypatch.setattr(assistant.mcp_server, "connect", fake_connect)
+    return calls
+
+
+def test_mcp_connection_reused(fake_mcp):
+    """The MCP server is connected once and reused by later calls."""
+
+    async def run_twice():
+        await assistant._ensure_mcp_connected()
+        await assistant._ensure_mcp_connected()
+
+    # Run on the agent loop, as answer() does, so _mcp_loop never points at a
+    # short-lived loop that later tests would inherit
+    asyncio.run_coroutine_threadsafe(run_twice(), assistant._AGENT_LOOP).result(timeout=5)
+    assert len(fake_mcp) == 1
+    assert assistant._mcp_loop is assistant._AGENT_LOOP
+
+
+def test_lost_mcp_connection_reconnects_on_next_turn(fake_mcp, monkeypatch):
+    """A tool call failing on a dropped connection resets the MCP session."""
+    import anyio
+    from agents.exceptions import AgentsException
+
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    mock_result = MagicMock()
+    mock_result.final_output = "ok"
+    dropped = AgentsException("Error invoking MCP tool sql")
+    dropped.__cause__ = anyio.ClosedResourceError()
+    run = AsyncMock(side_effect=[dropped, mock_result])
+    session_id = session_manager.create_session()
+    try:
+        with patch("agent.assistant.Runner.run", new=run):
+            failed, _ = assistant.answer("first", session_id=session_id)
+            assert assistant.mcp_server.session is None
+            response, _ = assistant.answer("second", session_id=session_id)
+
+        assert failed.startswith("Error:")
+        assert response == "ok"
+        assert len(fake_mcp) == 2
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_answer_runs_on_persistent_loop(fake_mcp, monkeypatch):
+    """Consecutive answer() calls share one event loop and one MCP session."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    mock_result = MagicMock()
+    mock_result.final_output = "4"
+    session_id = session_manager.create_session()
+    try:
+        with patch(
+            "agent.assistant.Runner.run", new=AsyncMock(return_value=mock_result)
+        ):
+            first, _ = assistant.answer("What is 2+2?", session_id=session_id)
+            second, _ = assistant.answer("And again?", session_id=session_id)
+        assert first == second == "4"
+        assert len(fake_mcp) == 1
+        assert assistant._mcp_loop is assistant._AGENT_LOOP
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_answer_many_preserves_order_and_bounds_concurrency(fake_mcp, monkeypatch):
+    """Batch answers come back in input order with bounded concurrency."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    in_flight = 0
+    peak = 0
+
+    async def fake_run(starting_agent, input, max_turns):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        result = MagicMock()
+        result.final_output = input[-1]["content"].upper()
+        return result
+
+    prompts = [(f"prompt {i}", None) for i in range(6)]
+    with patch("agent.assistant.Runner.run", new=fake_run):
+        results = asyncio.run(assistant.answer_many(prompts, max_concurrency=2))
+
+    assert [response for response, _ in results] == [f"PROMPT {i}" for i in range(6)]
+    assert peak <= 2
+
+
+def test_long_history_is_summarised(fake_mcp, monkeypatch):
+    """Older messages are summarised and only the recent window is resent."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    inputs = {}
+
+    async def fake_run(starting_agent, input, max_turns):
+        inputs[starting_agent.name] = input
+        result = MagicMock()
+        is_summary = starting_agent.name != assistant.agent.name
+        result.final_output = "SUMMARY" if is_summary else "done"
+        return result
+
+    session_id = session_manager.create_session()
+    try:
+        for i in range(30):
+            role = "user" if i % 2 == 0 else "assistant"
+            session_manager.add_message(session_id, role, f"message {i}")
+
+        with patch("agent.assistant.Runner.run", new=fake_run):
+            response, _ = assistant.answer("latest question", session_id=session_id)
+
+        session = session_manager.get_session(session_id)
+        assert response == "done"
+        assert session.summary == "SUMMARY"
+        assert session.summary_upto_idx == 31 - assistant.HISTORY_WINDOW
+
+        sent = inputs[assistant.agent.name]
+        assert sent[0]["role"] == "system" and "SUMMARY" in sent[0]["content"]
+        assert len(sent) == assistant.HISTORY_WINDOW + 1
+        assert sent[-1]["content"] == "latest question"
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_file_context_sent_after_stable_prefix(fake_mcp, monkeypatch):
+    """File references are a separate message and the system prompt never changes."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    sent = []
+
+    async def fake_run(starting_agent, input, max_turns):
+        sent.append(list(input))
+        result = MagicMock()
+        result.final_output = "ok"
+        result.to_input_list.return_value = list(input) + [
+            {"role": "assistant", "content": "ok"}
+        ]
+        return result
+
+    session_id = session_manager.create_session()
+    session_manager.register_file(session_id, "csv", "/tmp/people.csv")
+    try:
+        with patch("agent.assistant.Runner.run", new=fake_run):
+            _, first = assistant.answer("summarise", session_id=session_id)
+            _, second = assistant.answer("again", session_id=session_id, prev_result=first)
+
+        assert assistant.agent.instructions is assistant.BASE_INSTRUCTIONS
+        assert sent[0][0] == {
+            "role": "system",
+            "content": "Available files:\n- CSV: /tmp/people.csv\n",
+        }
+        assert sent[0][1]["content"] == "summarise"
+        # The second turn extends the first turn's history without repeating files
+        assert sent[1][: len(sent[0])] == sent[0]
+        assert sum(m["role"] == "system" for m in sent[1]) == 1
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_identical_turns_reuse_cached_response(fake_mcp, monkeypatch):
+    """A repeated turn with the same history is answered from the cache."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "AGENT_CACHE", True)
+    mock_result = MagicMock()
+    mock_result.final_output = "4"
+    mock_result.new_items = []
+    run = AsyncMock(return_value=mock_result)
+    sessions = [session_manager.create_session() for _ in range(2)]
+    try:
+        with patch("agent.assistant.Runner.run", new=run):
+            first = assistant.answer("What is 2+2?", session_id=sessions[0])
+            second = assistant.answer("What is 2+2?", session_id=sessions[1])
+            # Same prompt, but the history now differs
+            assistant.answer("What is 2+2?", session_id=sessions[1])
+
+        assert first == second == ("4", mock_result)
+        assert run.await_count == 2
+        assert len(session_manager.get_messages(sessions[1])) == 4
+    finally:
+        for session_id in sessions:
+            session_manager.delete_session(session_id)
+
+
+def test_turns_that_call_tools_are_not_cached(fake_mcp, monkeypatch):
+    """A run with tool calls is executed again, so its side effects happen again."""
+    from agents.items import ToolCallItem
+
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "AGENT_CACHE", True)
+    mock_result = MagicMock()
+    mock_result.final_output = "report.pdf"
+    mock_result.new_items = [MagicMock(spec=ToolCallItem)]
+    run = AsyncMock(return_value=mock_result)
+    sessions = [session_manager.create_session() for _ in range(2)]
+    try:
+        with patch("agent.assistant.Runner.run", new=run):
+            for session_id in sessions:
+                assistant.answer("Create a PDF report", session_id=session_id)
+
+        assert run.await_count == 2
+        assert not assistant._RESP_CACHE
+    finally:
+        for session_id in sessions:
+            session_manager.delete_session(session_id)
+
+
+def test_answer_recreates_evicted_session(fake_mcp, monkeypatch):
+    """A turn on an evicted session ID is still stored in that session."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    mock_result = MagicMock()
+    mock_result.final_output = "4"
+    session_id = session_manager.create_session()
+    session_manager.delete_session(session_id)
+    try:
+        with patch("agent.assistant.Runner.run", new=AsyncMock(return_value=mock_result)):
+            response, _ = assistant.answer("What is 2+2?", session_id=session_id)
+
+        assert response == "4"
+        assert [m["role"] for m in session_manager.get_messages(session_id)] == [
+            "user",
+            "assistant",
+        ]
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_slow_agent_run_times_out(fake_mcp, monkeypatch):
+    """A run exceeding AGENT_TIMEOUT_S returns a timeout message instead of hanging."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "AGENT_TIMEOUT_S", 0.05)
+
+    async def slow_run(starting_agent, input, max_turns):
+        await asyncio.sleep(5)
+
+    session_id = session_manager.create_session()
+    try:
+        with patch("agent.assistant.Runner.run", new=slow_run):
+            response, result = assistant.answer("hello", session_id=session_id)
+
+        assert result is None
+        assert "did not answer within 0.05 seconds" in response
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_stuck_turn_frees_the_calling_thread(fake_mcp, monkeypatch):
+    """answer() stops waiting on the agent loop after TURN_TIMEOUT_S."""
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "TURN_TIMEOUT_S", 0.05)
+
+    async def stuck_run(starting_agent, input, max_turns):
+        await asyncio.sleep(5)
+
+    session_id = session_manager.create_session()
+    try:
+        with patch("agent.assistant.Runner.run", new=stuck_run):
+            response, result = assistant.answer("hello", session_id=session_id)
+
+        assert result is None
+        assert "did not finish the turn within 0.05 seconds" in response
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_answer_leaves_shared_agent_model_untouched(fake_mcp, monkeypatch):
+    """Each turn runs a copy of the agent, so concurrent providers cannot mix."""
+    ollama_model = object()
+    monkeypatch.setattr(assistant, "_check_ollama_available", lambda: True)
+    monkeypatch.setattr(assistant, "get_ollama_model_name", lambda: "qwen3:8b")
+    monkeypatch.setattr(assistant, "create_ollama_model", lambda: ollama_model)
+    shared_model = assistant.agent.model
+    models = []
+
+    async def fake_run(starting_agent, input, max_turns):
+        models.append(starting_agent.model)
+        return MagicMock(final_output="ok", new_items=[])
+
+    session_id = session_manager.create_session()
+    try:
+        with patch("agent.assistant.Runner.run", new=fake_run):
+            response, _ = assistant.answer("hello", provider="ollama", session_id=session_id)
+
+        assert response == "ok"
+        assert models == [ollama_model]
+        assert assistant.agent.model is shared_model
+    finally:
+        session_manager.delete_session(session_id)
+
+
+def test_refreshing_openai_client_closes_previous_pool(monkeypatch):
+    """Reconfiguring the OpenAI client closes the one it replaces."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "_openai_client", None)
+    monkeypatch.setattr(assistant, "set_default_openai_client", MagicMock())
+
+    assistant._configure_openai_client()
+    first = assistant._openai_client
+    assistant._configure_openai_client()
+    second = assistant._openai_client
+    try:
+        assert second is not first
+        assert first.is_closed()
+        assert not second.is_closed()
+    finally:
+        asyncio.run_coroutine_threadsafe(second.close(), assistant._AGENT_LOOP).result(
+            timeout=5
+        )
+
+
+def test_inmemory_mcp_transport_lists_and_calls_tools():
+    """The in-memory transport reaches an MCP server without any HTTP."""
+    from mcp import types
+    from mcp.server import Server
+
+    from agent.mcp_transport import MCPServerInMemory
+
+    server = Server("test")
+
+    @server.list_tools()
+    async def list_tools():
+        return [types.Tool(name="echo", description="Echo", inputSchema={"type": "object"})]
+
+    @server.call_tool()
+    async def call_tool(name, arguments):
+        return [types.TextContent(type="text", text=arguments["text"])]
+
+    async def run():
+        client = MCPServerInMemory(server)
+        await client.connect()
+        try:
+            tools = await client.list_tools()
+            result = await client.call_tool("echo", {"text": "hi"})
+        finally:
+            await client.cleanup()
+        return tools, result
+
+    tools, result = asyncio.run(run())
+    assert [tool.name for tool in tools] == ["echo"]
+    assert result.content[0].text == "hi"
+
+
+def test_switching_to_inmemory_mcp_closes_open_session(fake_mcp, monkeypatch):
+    """An SSE session opened before the switch is cleaned up, not leaked."""
+    from mcp.server import Server
+
+    sse_server = assistant.mcp_server
+    cleanup = AsyncMock()
+    monkeypatch.setattr(sse_server, "cleanup", cleanup)
+    monkeypatch.setattr(assistant, "mcp_server", sse_server)
+    monkeypatch.setattr(assistant.agent, "mcp_servers", assistant.agent.mcp_servers)
+
+    asyncio.run_coroutine_threadsafe(
+        assistant._ensure_mcp_connected(), assistant._AGENT_LOOP
+    ).result(timeout=5)
+    assistant.use_inmemory_mcp(Server("test"))
+
+    cleanup.assert_awaited_once()
+    assert sse_server.session is None
+    assert assistant.mcp_server is not sse_server
+
+
+def test_answer_connects_mcp_once_across_turns(monkeypatch):
+    """Several turns over a real MCP transport perform a single connect."""
+    from mcp.server import Server
+
+    from agent.mcp_transport import MCPServerInMemory
+
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "mcp_server", assistant.mcp_server)
+    monkeypatch.setattr(assistant.agent, "mcp_servers", assistant.agent.mcp_servers)
+
+    connects = []
+    original_connect = MCPServerInMemory.connect
+
+    async def counting_connect(self):
+        connects.append(1)
+        await original_connect(self)
+
+    monkeypatch.setattr(MCPServerInMemory, "connect", counting_connect)
+    assistant.use_inmemory_mcp(Server("test"))
+
+    mock_result = MagicMock()
+    mock_result.final_output = "ok"
+    session_id = session_manager.create_session()
+    try:
+        with patch("agent.assistant.Runner.run", new=AsyncMock(return_value=mock_result)):
+            for i in range(3):
+                assistant.answer(f"turn {i}", session_id=session_id)
+        assert len(connects) == 1
+    finally:
+        session_manager.delete_session(session_id)
+        asyncio.run_coroutine_threadsafe(
+            assistant.mcp_server.cleanup(), assistant._AGENT_LOOP
+        ).result(timeout=5)
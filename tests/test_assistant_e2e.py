@@ -1,131 +1,228 @@
 import os
 import re
 import time
-import glob
 import pytest
-import traceback
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import MagicMock
 from agent import answer
 
-pytestmark = pytest.mark.skipif(
+log = logging.getLogger(__name__)
+
+# Repository root, which relative report paths are resolved against
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# PDF paths mentioned in agent replies, absolute or relative
+_ANY_PDF = re.compile(r"([\w\./\-]+\.pdf)")
+
+# Phrases that suggest the agent hit an error
+ERROR_INDICATORS = (
+    "error",
+    "failed",
+    "unable",
+    "cannot",
+    "couldn't",
+    "can't",
+    "not able",
+)
+
+# Live tests call the real OpenAI API; deselect them with -m "not live"
+requires_openai = pytest.mark.skipif(
     not os.getenv("OPENAI_API_KEY"),
     reason="requires OpenAI key",
 )
 
 
+def _stat_or_none(path):
+    """Return os.stat(path), or None if the file does not exist."""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _report_path(reply):
+    """Return the first PDF path named in ``reply``, resolved against the repo root."""
+    paths = _ANY_PDF.findall(reply)
+    assert paths, f"No PDF path in reply: {reply!r}"
+    return (_REPO_ROOT / paths[0]).resolve()
+
+
+@pytest.fixture
+def session_id():
+    """A fresh session, deleted after the test."""
+    from agent import session_manager
+
+    session_id = session_manager.create_session()
+    yield session_id
+    session_manager.delete_session(session_id)
+
+
+@pytest.fixture
+def agent_run(monkeypatch):
+    """Stub the agent run with one that calls the PDF tool, as the real agent does."""
+    from agent import assistant
+    from tools.pdf_tool import create_pdf
+
+    async def fake_connect():
+        assistant.mcp_server.session = object()
+
+    async def fake_run(starting_agent, input, max_turns):
+        # The default out_path, so the report goes to the reports directory
+        pdf_path = create_pdf({"total_sales_2024": 1282.38}, include_chart=False)
+        result = MagicMock()
+        result.final_output = (
+            f"Total sales for 2024 were $1,282.38. The PDF report is at {pdf_path}"
+        )
+        result.new_items = []
+        return result
+
+    monkeypatch.setattr(assistant, "_HAS_OPENAI_KEY", True)
+    monkeypatch.setattr(assistant, "_RESP_CACHE", OrderedDict())
+    monkeypatch.setattr(assistant.mcp_server, "session", None)
+    monkeypatch.setattr(assistant.mcp_server, "connect", fake_connect)
+    monkeypatch.setattr(assistant.Runner, "run", fake_run)
+
+
+def test_simple_pdf_report_mocked(agent_run, session_id, reports_dir):
+    """The report named in the reply exists in the reports directory."""
+    rep, _ = answer("Create a PDF report for ACME, total 1000", session_id=session_id)
+    pdf_path = _report_path(rep)
+    assert pdf_path.parent == reports_dir.resolve()
+    assert pdf_path.name.startswith("report-")
+    assert pdf_path.is_file()
+
+
+def test_sql_and_pdf_mocked(agent_run, session_id, reports_dir):
+    """A SQL + PDF turn reports the sales total and links a complete PDF."""
+    rep, _ = answer(
+        "Give me total sales for 2024 and create a PDF report", session_id=session_id
+    )
+    assert "1,282.38" in rep
+    pdf_path = _report_path(rep)
+    assert pdf_path.parent == reports_dir.resolve()
+    st = _stat_or_none(pdf_path)
+    assert st and st.st_size > 1000
+
+
+@pytest.mark.live
+@requires_openai
 def test_simple_pdf_report():
     """Test that the agent can create a PDF report with minimal information."""
     rep, _ = answer("Create a PDF report for ACME, total 1000")
     # Check that the response mentions PDF and contains a file path
-    assert "pdf" in rep.lower() and ".pdf" in rep.lower()
+    rep_lower = rep.lower()
+    assert "pdf" in rep_lower and ".pdf" in rep_lower
     # Check if the report was actually created
     assert "/reports/report-" in rep
 
 
+@pytest.mark.live
+@requires_openai
 def test_natural_language_sql_and_pdf():
     """Test that the agent can query a database and create a PDF report."""
     # Error logs capture
     start_time = time.time()
-    print("\n==== START PDF CREATION TEST ====")
+    log.debug("==== START PDF CREATION TEST ====")
 
     try:
         # Test with a natural language command that requires SQL + PDF
         rep, _ = answer("Give me total sales for 2024 and create a PDF report")
-        print(f"Agent response: {rep}")
+        log.debug("Agent response: %s", rep)
+        rep_lower = rep.lower()
 
         # 1. Check if the response mentions the correct sales total
         sales_total_present = "1282.38" in rep or "1,282.38" in rep
         if not sales_total_present:
-            print("❌ Sales total (1282.38) not mentioned in the response")
+            log.warning("❌ Sales total (1282.38) not mentioned in the response")
         else:
-            print("✅ Sales total found in the response")
+            log.debug("✅ Sales total found in the response")
 
         # 2. Check if the response mentions a PDF
-        pdf_mentioned = "pdf" in rep.lower()
+        pdf_mentioned = "pdf" in rep_lower
         if not pdf_mentioned:
-            print("❌ Response doesn't mention PDF")
+            log.warning("❌ Response doesn't mention PDF")
         else:
-            print("✅ PDF mentioned in the response")
+            log.debug("✅ PDF mentioned in the response")
 
         # 3. Check if the response contains any error mentions
-        error_indicators = [
-            "error",
-            "failed",
-            "unable",
-            "cannot",
-            "couldn't",
-            "can't",
-            "not able",
-        ]
         errors_in_response = [
-            indicator for indicator in error_indicators if indicator in rep.lower()
+            indicator for indicator in ERROR_INDICATORS if indicator in rep_lower
         ]
         if errors_in_response:
-            print(
-                f"⚠️ Error mentions detected in response: "
-                f"{', '.join(errors_in_response)}"
+            log.warning(
+                "⚠️ Error mentions detected in response: %s",
+                ", ".join(errors_in_response),
             )
 
         # 4. Try to extract the PDF path from the response
         pdf_found = False
 
-        # Search for absolute paths
-        pdf_paths = re.findall(r"(/[\w\./\-]+\.pdf)", rep)
+        # Find every PDF path in one scan, then split absolute from relative
+        all_pdf_paths = _ANY_PDF.findall(rep)
+        pdf_paths = [path for path in all_pdf_paths if path.startswith("/")]
+        rel_pdf_paths = [path for path in all_pdf_paths if not path.startswith("/")]
+
+        # Check absolute paths
         if pdf_paths:
-            print(f"Absolute PDF paths found in response: {pdf_paths}")
+            log.debug("Absolute PDF paths found in response: %s", pdf_paths)
             # Check if at least one mentioned path exists
             for path in pdf_paths:
-                if os.path.exists(path):
-                    print(f"✅ PDF found with absolute path: {path}")
+                st = _stat_or_none(path)
+                if st:
+                    log.debug("✅ PDF found with absolute path: %s", path)
                     pdf_found = True
-                    if os.path.getsize(path) > 1000:
-                        size = os.path.getsize(path)
-                        print(f"✅ PDF has correct size: {size} bytes")
+                    size = st.st_size
+                    if size > 1000:
+                        log.debug("✅ PDF has correct size: %d bytes", size)
                     else:
-                        size = os.path.getsize(path)
-                        print(f"⚠️ PDF found but suspicious size: {size} bytes")
+                        log.warning("⚠️ PDF found but suspicious size: %d bytes", size)
                 else:
-                    print(f"❌ Mentioned path doesn't exist: {path}")
+                    log.warning("❌ Mentioned path doesn't exist: %s", path)
 
-        # Search for relative paths
-        rel_pdf_paths = re.findall(r"([\w\./\-]+\.pdf)", rep)
+        # Check relative paths
         if rel_pdf_paths:
-            print(f"Relative PDF paths found in response: {rel_pdf_paths}")
+            log.debug("Relative PDF paths found in response: %s", rel_pdf_paths)
             for rel_path in rel_pdf_paths:
-                if not rel_path.startswith("/"):
-                    base_path = os.path.dirname(os.path.dirname(__file__))
-                    full_path = f"{base_path}/{rel_path}"
-                    if os.path.exists(full_path):
-                        print(f"✅ PDF found with relative path: {full_path}")
-                        pdf_found = True
-                        size = os.path.getsize(full_path)
-                        if size > 1000:
-                            print(f"✅ PDF has correct size: {size} bytes")
-                        else:
-                            print(f"⚠️ PDF found but suspicious size: {size} bytes")
+                full_path = str(_REPO_ROOT / rel_path)
+                st = _stat_or_none(full_path)
+                if st:
+                    log.debug("✅ PDF found with relative path: %s", full_path)
+                    pdf_found = True
+                    size = st.st_size
+                    if size > 1000:
+                        log.debug("✅ PDF has correct size: %d bytes", size)
                     else:
-                        print(f"❌ Mentioned relative path doesn't exist: {full_path}")
+                        log.warning("⚠️ PDF found but suspicious size: %d bytes", size)
+                else:
+                    log.warning("❌ Mentioned relative path doesn't exist: %s", full_path)
 
         # If no mentioned path works, check recent files
         if not pdf_found:
-            print(
+            from tools import pdf_tool
+
+            log.debug(
                 "No PDF mentioned in the response was found. Looking for recent files..."
             )
-            base_dir = os.path.dirname(os.path.dirname(__file__))
-            pattern = f"{base_dir}/reports/report-*.pdf"
-            recent_pdfs = glob.glob(pattern)
+            with os.scandir(pdf_tool.REPORT_DIR) as entries:
+                recent_pdfs = [
+                    (entry.stat().st_mtime, entry.path)
+                    for entry in entries
+                    if entry.name.startswith("report-") and entry.name.endswith(".pdf")
+                ]
             if recent_pdfs:
-                recent_pdfs.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-                newest_pdf = recent_pdfs[0]
-                pdf_age = time.time() - os.path.getmtime(newest_pdf)
-                print(f"Most recent PDF: {newest_pdf} (age: {pdf_age:.1f} seconds)")
+                newest_mtime, newest_pdf = max(recent_pdfs)
+                pdf_age = time.time() - newest_mtime
+                log.debug("Most recent PDF: %s (age: %.1f seconds)", newest_pdf, pdf_age)
 
                 if pdf_age < 60:  # File created in the last minute
-                    print(f"✅ Recent PDF found: {newest_pdf}")
+                    log.debug("✅ Recent PDF found: %s", newest_pdf)
                     pdf_found = True
                 else:
-                    print(f"❌ Most recent PDF is too old: {pdf_age:.1f} seconds")
+                    log.warning("❌ Most recent PDF is too old: %.1f seconds", pdf_age)
             else:
-                print("❌ No PDF files found in reports/ folder")
+                log.warning("❌ No PDF files found in %s", pdf_tool.REPORT_DIR)
 
         # Check if essential conditions are met
         assert sales_total_present, "Sales total (1282.38) not mentioned in response"
@@ -133,8 +230,7 @@ def test_natural_language_sql_and_pdf():
         # assert pdf_found, "No valid PDF was found or created"
 
     except Exception as e:
-        print(f"❌ EXCEPTION during test: {str(e)}")
-        traceback.print_exc()
+        log.error("❌ EXCEPTION during test: %s", e, exc_info=True)
         raise
     finally:
-        print(f"==== END OF TEST (duration: {time.time() - start_time:.1f}s) ====\n")
+        log.debug("==== END OF TEST (duration: %.1fs) ====", time.time() - start_time)
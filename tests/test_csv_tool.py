@@ -5,8 +5,14 @@ from tools.csv_tool import summarise_csv
 SAMPLE = "data/people.csv"
 
 
-def test_summary_keys():
-    info = summarise_csv(SAMPLE)
+@pytest.fixture(scope="module")
+def csv_summary():
+    """Summarise SAMPLE once for every test in this module."""
+    return summarise_csv(SAMPLE)
+
+
+def test_summary_keys(csv_summary):
+    info = csv_summary
     # Updated to include new keys added to the function
     assert set(info) == {"row_count", "column_count", "columns", "filename", "filepath"}
     assert info["row_count"] == 3
@@ -44,3 +50,52 @@ def test_wrong_extension(tmp_path):
     txt.write_text("hello")
     with pytest.raises(ValueError):
         summarise_csv(txt)
+
+
+def test_row_limit_aborts_while_streaming(tmp_path, monkeypatch):
+    from tools import csv_tool
+
+    big = tmp_path / "big.csv"
+    big.write_text("n\n" + "\n".join(str(i) for i in range(10)) + "\n")
+    monkeypatch.setattr(csv_tool, "MAX_ROWS", 5)
+    monkeypatch.setattr(csv_tool, "CHUNK_ROWS", 2)
+    with pytest.raises(ValueError, match="too large"):
+        summarise_csv(big)
+
+
+def test_chunked_summary_matches_single_read(tmp_path, monkeypatch):
+    """Dtypes and missing counts are merged across chunks like a single read."""
+    import pandas as pd
+    from tools import csv_tool
+
+    mixed = tmp_path / "mixed.csv"
+    mixed.write_text("a,b\n1,x\n2,\n3,y\n,z\n")
+    monkeypatch.setattr(csv_tool, "CHUNK_ROWS", 2)
+    info = summarise_csv(mixed)
+    df = pd.read_csv(mixed)
+    assert info["row_count"] == len(df)
+    assert [(c["inferred_type"], c["missing_values"]) for c in info["columns"]] == [
+        (str(df[col].dtype), int(df[col].isna().sum())) for col in df.columns
+    ]
+
+
+def test_summary_cached_until_file_changes(tmp_path, monkeypatch):
+    from tools import csv_tool
+
+    data = tmp_path / "cached.csv"
+    data.write_text("a,b\n1,2\n")
+    summarise_csv.cache_clear()
+    first = summarise_csv(data)
+
+    # An unchanged file is answered from the cache without parsing
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV was parsed again")
+
+    monkeypatch.setattr(csv_tool.pd, "read_csv", fail)
+    assert summarise_csv(data) == first
+    monkeypatch.undo()
+
+    # Appending a row changes size and mtime, so the file is read again
+    data.write_text("a,b\n1,2\n3,\n")
+    assert summarise_csv(data)["row_count"] == 2
+    summarise_csv.cache_clear()
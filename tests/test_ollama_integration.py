@@ -4,16 +4,18 @@ import warnings
 from agent.ollama_integration import (
     check_ollama_available,
     get_ollama_model_name,
+    refresh_env,
     create_ollama_model,
 )
-from agent import answer
-import httpx
 
 # Suppress the coroutine warning for tests
 warnings.filterwarnings(
     "ignore", message="coroutine '.*' was never awaited", category=RuntimeWarning
 )
 
+# Probe Ollama once for every skip decision in this module
+OLLAMA_AVAILABLE = check_ollama_available()
+
 
 def test_check_ollama_available():
     """Test that the check_ollama_available function works correctly."""
@@ -23,7 +25,28 @@ def test_check_ollama_available():
     assert isinstance(result, bool)
 
 
-def test_ollama_model_names():
+def test_check_ollama_available_is_cached(monkeypatch):
+    """Repeated availability checks within the TTL reuse the first probe."""
+    import httpx
+
+    from agent import ollama_integration
+
+    calls = []
+
+    class FakeClient:
+        def get(self, url):
+            calls.append(url)
+            return httpx.Response(200)
+
+    monkeypatch.setattr(ollama_integration, "_OLLAMA_OK_CACHE", None)
+    monkeypatch.setattr(ollama_integration, "_probe_client", FakeClient())
+
+    assert check_ollama_available() is True
+    assert check_ollama_available() is True
+    assert len(calls) == 1
+
+
+def test_ollama_model_names(monkeypatch):
     """Test that the model name is correctly formatted for Ollama."""
     # Test default or environment value
     model_name = get_ollama_model_name()
@@ -31,34 +54,41 @@ def test_ollama_model_names():
     assert isinstance(model_name, str)
 
     # Test with explicit model name containing colons
-    os.environ["OLLAMA_MODEL"] = "qwen3:8b:latest"
-    # The function simply returns the environment variable value without modifications
-    assert get_ollama_model_name() == "qwen3:8b:latest"
-
-    # Reset environment
-    if "OLLAMA_MODEL" in os.environ:
-        del os.environ["OLLAMA_MODEL"]
+    monkeypatch.setenv("OLLAMA_MODEL", "qwen3:8b:latest")
+    # The environment is read once; refresh_env() picks up the change
+    refresh_env()
+    try:
+        # The function simply returns the environment variable value without modifications
+        assert get_ollama_model_name() == "qwen3:8b:latest"
+    finally:
+        # Re-read the environment once monkeypatch has restored it
+        monkeypatch.undo()
+        refresh_env()
 
 
-@pytest.mark.skipif(not check_ollama_available(), reason="Ollama not available")
+@pytest.mark.skipif(not OLLAMA_AVAILABLE, reason="Ollama not available")
 def test_ollama_provider():
     """Test the Ollama provider works with direct integration."""
     try:
         print("\nTesting direct integration with Ollama...")
 
+        from agent import answer
+
         # Test the model creation function directly instead of making API calls
         model = create_ollama_model()
         assert model is not None, "Ollama model should not be None"
 
         # Mock the answer function to avoid actual API calls
-        from unittest.mock import patch, MagicMock
+        from unittest.mock import patch, MagicMock, AsyncMock
 
         # Create a mock for the Runner.run result
         mock_result = MagicMock()
         mock_result.final_output = "The answer to 2+2 is 4"
 
-        # Patch the asyncio run function to avoid actual API calls
-        with patch("agent.assistant.asyncio.run", return_value=mock_result):
+        # Patch the agent runner to avoid actual API calls
+        with patch(
+            "agent.assistant.Runner.run", new=AsyncMock(return_value=mock_result)
+        ):
             # This should now run without errors since the API call is mocked
             response, _ = answer("What is 2+2?", provider="ollama")
 
@@ -103,7 +133,7 @@ def test_ollama_provider():
         raise
 
 
-@pytest.mark.skipif(not check_ollama_available(), reason="Ollama not available")
+@pytest.mark.skipif(not OLLAMA_AVAILABLE, reason="Ollama not available")
 def test_ollama_tool_knowledge():
     """Test the Ollama integration with all available tools (CSV, SQL, PDF)."""
     # Skip this test for the same reason as test_ollama_provider
@@ -112,6 +142,7 @@ def test_ollama_tool_knowledge():
     return  # Skip the rest of the test
     try:
         # Create a session to maintain context
+        from agent import answer
         from agent.session_manager import session_manager
         from agents.mcp import MCPServerSse
 
@@ -126,12 +157,18 @@ def test_ollama_tool_knowledge():
                 "http://127.0.0.1:7860/gradio_api/mcp/sse",
             )
 
-            # Create MCP test client
-            test_client = httpx.Client()
-            response = test_client.get(MCP_SSE_URL.replace("/sse", ""))
-            print(f"MCP server response: {response.status_code}")
+            # Probe the MCP server with a single stdlib request
+            from urllib.error import HTTPError
+            from urllib.request import urlopen
 
-            assert response.status_code < 400, "MCP server not available"
+            try:
+                with urlopen(MCP_SSE_URL.replace("/sse", ""), timeout=5) as response:
+                    status = response.status
+            except HTTPError as e:
+                status = e.code
+            print(f"MCP server response: {status}")
+
+            assert status < 400, "MCP server not available"
             print("✅ MCP server is available")
         except Exception as mcp_err:
             print(f"⚠️ WARNING: MCP server check failed: {str(mcp_err)}")
@@ -162,13 +199,8 @@ def test_ollama_tool_knowledge():
                 return True
 
         # Run the async function to connect the server
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            is_connected = loop.run_until_complete(connect_mcp_server())
-            assert is_connected, "MCP server failed to connect"
-        finally:
-            loop.close()
+        is_connected = asyncio.run(connect_mcp_server())
+        assert is_connected, "MCP server failed to connect"
 
         # Simply log that we're using an Ollama model
         model_name = get_ollama_model_name()
@@ -270,6 +302,8 @@ def test_openai_provider():
 
 def test_provider_fallback():
     """Test fallback behavior when providers are unavailable."""
+    from agent import answer
+
     # Test fallback if Ollama is unavailable
     if not check_ollama_available():
         response, result = answer("Test", provider="ollama")
@@ -283,3 +317,22 @@ def test_provider_fallback():
         assert "⚠️ OPENAI_API_KEY not set" in response, (
             "Expected API key message for OpenAI provider"
         )
+
+
+def test_create_ollama_model_is_cached(monkeypatch):
+    """The Ollama model wrapper and its client are reused across calls."""
+    monkeypatch.setenv("OLLAMA_MODEL", "qwen3:8b")
+    from agent.ollama_integration import _get_ollama_client
+
+    assert create_ollama_model() is create_ollama_model()
+    assert _get_ollama_client() is _get_ollama_client()
+
+
+def test_cached_ollama_client_is_left_open_between_tests():
+    """The per-test httpx cleanup skips the cached Ollama client."""
+    from agent.ollama_integration import _get_ollama_client
+    from tests.conftest import _cached_client_ids
+
+    client = _get_ollama_client()
+    assert id(client._client) in _cached_client_ids()
+    assert not client._client.is_closed
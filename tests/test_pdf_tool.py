@@ -1,132 +1,122 @@
 from pathlib import Path
 import json
 import pytest
-import traceback
 from tools.pdf_tool import create_pdf, _build_table
+from tests.pdf_helpers import count_markers
 
+pytestmark = pytest.mark.usefixtures("warm_pdf")
 
-def test_pdf_creation_size(tmp_path):
-    sample = {"foo": "bar", "grand_total": 999}
-    file_path = create_pdf(sample, out_path=tmp_path / "test.pdf")
-    assert Path(file_path).exists()
-    assert Path(file_path).stat().st_size > 1000
-
-
-def test_pdf_empty_data():
-    with pytest.raises(ValueError):
-        create_pdf({})
-
-
-def test_table_builder():
-    """Test the table builder function separately to isolate issues."""
-    try:
-        data = {"customer": "Test", "value": 123, "grand_total": 456}
-        table = _build_table(data)
-        assert table is not None
-    except Exception as e:
-        print(f"Table builder failed: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"Table builder failed: {str(e)}")
 
-
-def test_pdf_with_different_data_types(tmp_path):
-    """Test PDF creation with various data types."""
-    try:
-        # Mix of data types
-        sample = {
+def _sql_like_report():
+    """Flatten SQL-style rows into the dict shape the agent sends to the PDF tool."""
+    sql_results = [
+        {"year": 2024, "month": "January", "sales": 456.78},
+        {"year": 2024, "month": "February", "sales": 345.6},
+        {"year": 2024, "month": "March", "sales": 480.0},
+    ]
+    data = {
+        "title": "Sales Report 2024",
+        "total_sales": sum(item["sales"] for item in sql_results),
+        "data_source": "sales.db",
+    }
+    for i, item in enumerate(sql_results, 1):
+        data[f"month_{i}"] = item["month"]
+        data[f"sales_{i}"] = item["sales"]
+    data["grand_total"] = data["total_sales"]
+    return data
+
+
+# Report payload shared by the wrapper tests, serialised once per module
+SALES_REPORT = {
+    "title": "Sales Report 2024",
+    "total_sales": 1282.38,
+    "grand_total": 1282.38,
+}
+SALES_REPORT_JSON = json.dumps(SALES_REPORT)
+
+
+# Flat report payloads; each case builds one PDF through create_pdf
+FLAT_REPORTS = {
+    "minimal": ({"foo": "bar", "grand_total": 999}, True),
+    "data_types": (
+        {
             "string": "text value",
             "integer": 42,
             "float": 3.14159,
             "boolean": True,
             "none_value": None,
             "grand_total": 999,
-        }
-        file_path = create_pdf(sample, out_path=tmp_path / "datatypes.pdf")
-        assert Path(file_path).exists()
-    except Exception as e:
-        print(f"PDF creation with mixed data types failed: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"PDF creation failed: {str(e)}")
-
-
-def test_pdf_from_json_string(tmp_path):
-    """Test PDF creation from JSON string similar to agent use case."""
-    try:
-        # JSON string similar to what the agent might produce
-        json_str = """
+        },
+        True,
+    ),
+    "agent_json": (
+        json.loads(
+            """
+            {
+                "title": "Sales Report",
+                "customer": "ACME Inc",
+                "total": 1282.38,
+                "year": 2024,
+                "items": 42,
+                "grand_total": 1282.38
+            }
+            """
+        ),
+        True,
+    ),
+    "sql_like": (_sql_like_report(), True),
+    "without_chart": (
+        {"customer": "No Chart Test", "value": 500, "grand_total": 500},
+        False,
+    ),
+    "edge_cases": (
         {
-            "title": "Sales Report",
-            "customer": "ACME Inc",
-            "total": 1282.38,
-            "year": 2024,
-            "items": 42,
-            "grand_total": 1282.38
-        }
-        """
-        # Parse JSON to dict
-        data = json.loads(json_str)
-        file_path = create_pdf(data, out_path=tmp_path / "from_json.pdf")
-        assert Path(file_path).exists()
-    except Exception as e:
-        print(f"PDF creation from JSON string failed: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"PDF creation failed: {str(e)}")
-
-
-def test_pdf_with_sql_like_data(tmp_path):
-    """Test PDF creation with data structure similar to SQL query results."""
-    try:
-        # Similar to what might come from SQL query results
-        sql_results = [
-            {"year": 2024, "month": "January", "sales": 456.78},
-            {"year": 2024, "month": "February", "sales": 345.6},
-            {"year": 2024, "month": "March", "sales": 480.0},
-        ]
-        # Convert to format expected by PDF tool
-        data = {
-            "title": "Sales Report 2024",
-            "total_sales": sum(item["sales"] for item in sql_results),
-            "data_source": "sales.db",
-        }
-        # Add each row from SQL results
-        for i, item in enumerate(sql_results, 1):
-            data[f"month_{i}"] = item["month"]
-            data[f"sales_{i}"] = item["sales"]
-        # Add grand total
-        data["grand_total"] = data["total_sales"]
-        file_path = create_pdf(data, out_path=tmp_path / "sql_results.pdf")
-        assert Path(file_path).exists()
-    except Exception as e:
-        print(f"SQL results PDF creation failed: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"PDF creation failed: {str(e)}")
-
-
-def test_pdf_without_chart(tmp_path):
-    """Test PDF creation with chart disabled."""
-    sample = {"customer": "No Chart Test", "value": 500, "grand_total": 500}
+            "title": "Edge Case Test",
+            "long_description": (
+                "This is a very long text that should be wrapped properly in the PDF table "
+            ) * 5,
+            "value_1": 100,
+            "value_2": 200,
+            "value_3": 300,
+            "grand_total": 600,
+        },
+        True,
+    ),
+    "empty_values": (
+        {
+            "title": "Empty Value Test",
+            "empty_string": "",
+            "none_value": None,
+            "zero_value": 0,
+            "grand_total": 1000,
+        },
+        True,
+    ),
+}
+
+
+@pytest.mark.parametrize(
+    "sample,include_chart", FLAT_REPORTS.values(), ids=FLAT_REPORTS.keys()
+)
+def test_pdf_from_flat_dict(tmp_path, sample, include_chart):
+    """Flat dicts of mixed values render to a non-trivial PDF."""
     file_path = create_pdf(
-        sample, out_path=tmp_path / "no_chart.pdf", include_chart=False
+        sample, out_path=tmp_path / "report.pdf", include_chart=include_chart
     )
     assert Path(file_path).exists()
+    assert Path(file_path).stat().st_size > 1000
 
 
-def test_pdf_with_edge_cases(tmp_path):
-    """Test PDF creation with edge cases."""
-    # Long text
-    long_text = (
-        "This is a very long text that should be wrapped properly in the PDF table "
-    ) * 5
-    data = {
-        "title": "Edge Case Test",
-        "long_description": long_text,
-        "value_1": 100,
-        "value_2": 200,
-        "value_3": 300,
-        "grand_total": 600,
-    }
-    file_path = create_pdf(data, out_path=tmp_path / "edge_case.pdf")
-    assert Path(file_path).exists()
+def test_pdf_empty_data():
+    with pytest.raises(ValueError):
+        create_pdf({})
+
+
+def test_table_builder():
+    """Test the table builder function separately to isolate issues."""
+    data = {"customer": "Test", "value": 123, "grand_total": 456}
+    table = _build_table(data)
+    assert table is not None
 
 
 def test_wrapper_function(tmp_path):
@@ -145,17 +135,11 @@ def test_wrapper_function(tmp_path):
         return create_pdf(data, out_path, include_chart)
 
     # Test case 1: Dict input
-    test_data = {
-        "title": "Sales Report 2024",
-        "total_sales": 1282.38,
-        "grand_total": 1282.38,
-    }
-    output_path = create_pdf_wrapper(test_data, out_path=tmp_path / "wrapper_dict.pdf")
+    output_path = create_pdf_wrapper(SALES_REPORT, out_path=tmp_path / "wrapper_dict.pdf")
     assert Path(output_path).exists()
 
     # Test case 2: JSON string input
-    json_data = json.dumps(test_data)
-    output_path = create_pdf_wrapper(json_data, out_path=tmp_path / "wrapper_json.pdf")
+    output_path = create_pdf_wrapper(SALES_REPORT_JSON, out_path=tmp_path / "wrapper_json.pdf")
     assert Path(output_path).exists()
 
     # Test case 3: Invalid JSON string input
@@ -185,60 +169,32 @@ def test_mcp_simulation_direct(tmp_path):
     }
 
     # Direct call with dictionary (like calling the tool directly)
-    try:
-        output_path = create_pdf(test_data, out_path=tmp_path / "mcp_direct_dict.pdf")
-        assert Path(output_path).exists()
-    except Exception as e:
-        print(f"Error with direct dict call: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"Direct dict call failed: {str(e)}")
-
-    # Call with JSON string (simulating agent sending JSON via MCP)
-    try:
-        json_data = json.dumps(test_data)
-        # Parse JSON (similar to create_pdf_wrapper in app.py)
-        data = json.loads(json_data)
-        output_path = create_pdf(data, out_path=tmp_path / "mcp_direct_json.pdf")
-        assert Path(output_path).exists()
-    except Exception as e:
-        print(f"Error with JSON string call: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"JSON string call failed: {str(e)}")
+    output_path = create_pdf(test_data, out_path=tmp_path / "mcp_direct_dict.pdf")
+    assert Path(output_path).exists()
 
     # Simulate error handling (malformed request)
-    try:
-        # Malformed data
-        bad_data = {
-            "error": "Invalid JSON",
-            "raw_input": "Please create a PDF with sales data",
-        }
-        output_path = create_pdf(bad_data, out_path=tmp_path / "mcp_malformed.pdf")
-        assert Path(output_path).exists()
-    except Exception as e:
-        print(f"Error with malformed data: {str(e)}")
-        traceback.print_exc()
-        pytest.fail(f"Malformed data call failed: {str(e)}")
-
-
-def test_empty_value_handling(tmp_path):
-    """Test handling of empty or None values."""
-    data = {
-        "title": "Empty Value Test",
-        "empty_string": "",
-        "none_value": None,
-        "zero_value": 0,
-        "grand_total": 1000,
+    bad_data = {
+        "error": "Invalid JSON",
+        "raw_input": "Please create a PDF with sales data",
     }
-    output_path = create_pdf(data, out_path=tmp_path / "empty_values.pdf")
+    output_path = create_pdf(bad_data, out_path=tmp_path / "mcp_malformed.pdf")
     assert Path(output_path).exists()
 
 
-def _count_images(pdf_path: Path) -> int:
-    with open(pdf_path, "rb") as f:
-        return f.read().count(b"/Subtype /Image")
+@pytest.fixture
+def uncompressed_pdf(monkeypatch):
+    """Write page streams uncompressed so text can be found in the raw bytes."""
+    from reportlab import rl_config
+
+    monkeypatch.setattr(rl_config, "pageCompression", 0)
 
 
-def test_pdf_with_cover_and_summary(tmp_path):
+def _page_count(raw: bytes) -> int:
+    # Every "/Type /Pages" tree node also matches "/Type /Page"
+    return raw.count(b"/Type /Page") - raw.count(b"/Type /Pages")
+
+
+def test_pdf_with_cover_and_summary(tmp_path, uncompressed_pdf):
     data = {
         "title": "Cover Report",
         "summary": "Quick overview",
@@ -246,12 +202,9 @@ def test_pdf_with_cover_and_summary(tmp_path):
         "sections": [{"title": "Intro", "type": "paragraph", "text": "Hello"}],
     }
     pdf_path = Path(create_pdf(data, out_path=tmp_path / "cover.pdf"))
-    assert pdf_path.exists()
-    from PyPDF2 import PdfReader
-
-    reader = PdfReader(str(pdf_path))
-    assert len(reader.pages) >= 2
-    assert "Quick overview" in reader.pages[0].extract_text()
+    raw = pdf_path.read_bytes()
+    assert _page_count(raw) >= 2
+    assert b"(Quick overview)" in raw
 
 
 def test_multiple_chart_specs(tmp_path):
@@ -275,7 +228,30 @@ def test_multiple_chart_specs(tmp_path):
     }
     pdf_path = Path(create_pdf(data, out_path=tmp_path / "multi.pdf"))
     assert pdf_path.exists()
-    assert _count_images(pdf_path) >= 3
+    assert count_markers(pdf_path, b"/Subtype /Image") >= 3
+
+
+def test_draw_chart_variants(tmp_path):
+    """Every chart type draws onto one reused figure."""
+    import matplotlib.pyplot as plt
+    from tools.pdf_tool import _draw_chart
+
+    specs = [
+        {"chart_type": "bar", "labels": ["A", "B"], "values": [1, 2]},
+        {"chart_type": "pie", "labels": ["X", "Y"], "values": [3, 7]},
+        {"chart_type": "line", "labels": [1, 2, 3], "values": [1, 4, 9]},
+    ]
+    fig, ax = plt.subplots()
+    try:
+        for i, spec in enumerate(specs):
+            ax.clear()
+            _draw_chart(ax, spec)
+            fig.savefig(tmp_path / f"{i}.png")
+            assert (tmp_path / f"{i}.png").stat().st_size > 0
+        with pytest.raises(ValueError):
+            _draw_chart(ax, {"chart_type": "radar"})
+    finally:
+        plt.close(fig)
 
 
 def test_builder_class(tmp_path):
@@ -331,10 +307,10 @@ def test_pdf_with_sections_and_charts(tmp_path):
 
     pdf_path = Path(create_pdf(data, out_path=tmp_path / "complex.pdf"))
     assert pdf_path.exists()
-    assert _count_images(pdf_path) >= 4
+    assert count_markers(pdf_path, b"/Subtype /Image") >= 4
 
 
-def test_cover_summary_box_structure(tmp_path):
+def test_cover_summary_box_structure(tmp_path, uncompressed_pdf):
     """Ensure summary text is placed inside a table on the cover page."""
     from tools.pdf_tool import PdfReportBuilder
     from reportlab.platypus import Table
@@ -344,12 +320,7 @@ def test_cover_summary_box_structure(tmp_path):
         assert any(isinstance(item, Table) for item in builder.story)
         pdf_path = builder.save()
 
-    pdf_file = Path(pdf_path)
-    assert pdf_file.exists()
-    from PyPDF2 import PdfReader
-
-    reader = PdfReader(str(pdf_file))
-    assert "Important" in reader.pages[0].extract_text()
+    assert b"(Important)" in Path(pdf_path).read_bytes()
 
 
 def test_builder_multiple_charts(tmp_path):
@@ -373,7 +344,26 @@ def test_builder_multiple_charts(tmp_path):
         for img in temp_images:
             assert not Path(img).exists()
 
-    assert _count_images(Path(pdf_path)) >= 2
+    assert count_markers(Path(pdf_path), b"/Subtype /Image") >= 2
+
+
+def test_builder_reuses_one_chart_figure(tmp_path):
+    """All charts of a report are drawn on one figure, closed on save."""
+    import matplotlib.pyplot as plt
+    from tools.pdf_tool import PdfReportBuilder
+
+    specs = [
+        {"chart_type": "bar", "labels": ["A", "B"], "values": [1, 2]},
+        {"chart_type": "pie", "labels": ["X", "Y"], "values": [3, 7]},
+        {"chart_type": "line", "labels": [1, 2], "values": [3, 4]},
+    ]
+    open_before = len(plt.get_fignums())
+    with PdfReportBuilder(tmp_path / "one_figure.pdf") as builder:
+        builder.add_section({"title": "Charts", "type": "chart", "chart_spec": specs})
+        assert len(plt.get_fignums()) == open_before + 1
+        assert len(builder.tmp_pngs) == 3
+        builder.save()
+    assert len(plt.get_fignums()) == open_before
 
 
 def test_tmp_images_cleanup_on_exit(tmp_path):
@@ -1,11 +1,14 @@
+import importlib
 import pytest
 import os
 import time
 from agent import answer, session_manager
+from agent.session_manager import SessionManager
 
 # Skip OpenAI tests if API key is not set
 skip_openai = not os.getenv("OPENAI_API_KEY")
 
+
 @pytest.mark.skipif(skip_openai, reason="OpenAI API key not set")
 def test_session_message_counter_real():
     """Test that session messages are properly incremented for each interaction using real API calls."""
@@ -84,6 +87,7 @@ def test_session_message_counter_real():
         print(f"Cleaning up test session: {session_id}")
         session_manager.delete_session(session_id)
 
+
 @pytest.mark.skipif(skip_openai, reason="OpenAI API key not set")
 def test_session_clear_real():
     """Test that clearing a session properly resets the message counter."""
@@ -124,4 +128,77 @@ def test_session_clear_real():
     finally:
         # Clean up
         print(f"Cleaning up test session: {session_id}")
-        session_manager.delete_session(session_id)
\ No newline at end of file
+        session_manager.delete_session(session_id)
+
+
+def test_sessions_evicted_least_recently_used():
+    """The session store is bounded and evicts the least recently used entry."""
+    manager = SessionManager(max_sessions=2)
+    first = manager.create_session()
+    second = manager.create_session()
+
+    # Touch the first session so the second becomes the eviction candidate
+    assert manager.get_session(first) is not None
+    third = manager.create_session()
+
+    assert manager.get_session(second) is None
+    assert manager.get_session(first) is not None
+    assert manager.get_session(third) is not None
+
+
+def test_evicted_session_is_recreated_under_same_id():
+    """An ID held by the UI keeps working after its session was evicted."""
+    manager = SessionManager(max_sessions=1)
+    evicted = manager.create_session()
+    manager.create_session()
+    assert manager.get_session(evicted) is None
+
+    session = manager.ensure_session(evicted)
+    manager.register_file(evicted, "csv", "/tmp/people.csv")
+    manager.add_message(evicted, "user", "hi")
+
+    assert manager.get_session(evicted) is session
+    assert manager.get_file(evicted, "csv") == "/tmp/people.csv"
+    assert [m["content"] for m in manager.get_messages(evicted)] == ["hi"]
+
+
+def test_prune_idle_sessions():
+    """Sessions idle for longer than the timeout are removed."""
+    manager = SessionManager()
+    stale = manager.create_session()
+    active = manager.create_session()
+    manager.sessions[stale].last_access -= 7200
+
+    assert manager.prune_idle_sessions(max_idle=3600) == 1
+    assert manager.get_session(stale) is None
+    assert manager.get_session(active) is not None
+
+
+def test_add_messages_appends_in_order():
+    """A whole turn can be stored with a single call."""
+    manager = SessionManager()
+    session_id = manager.create_session()
+    manager.add_message(session_id, "user", "hi")
+    manager.add_messages(
+        session_id,
+        [{"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}],
+    )
+
+    assert [m["content"] for m in manager.get_messages(session_id)] == ["hi", "q", "a"]
+
+
+def test_history_is_capped(monkeypatch):
+    """Only the most recent MAX_HISTORY messages are kept, and the summary index follows."""
+    # agent.session_manager is shadowed by the global instance on the package
+    session_module = importlib.import_module("agent.session_manager")
+    monkeypatch.setattr(session_module, "MAX_HISTORY", 4)
+    manager = SessionManager()
+    session_id = manager.create_session()
+    manager.update_summary(session_id, "summary", 2)
+    for i in range(6):
+        manager.add_message(session_id, "user", f"m{i}")
+
+    session = manager.get_session(session_id)
+    assert [m["content"] for m in session.messages] == ["m2", "m3", "m4", "m5"]
+    assert session.summary_upto_idx == 0
+    assert not hasattr(session, "__dict__")
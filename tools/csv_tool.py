@@ -3,7 +3,7 @@ CSV summary utility for the MCP Data Assistant.
 
 `summarise_csv(file_input: str | Path | FileUpload) -> dict`
 ----------------------------------
-* Opens the CSV file using pandas.
+* Reads the CSV file with pandas, chunk by chunk.
 * Returns basic statistics: number of rows, columns and
   per-column information (name, pandas-inferred dtype,
   missing value count).
@@ -15,6 +15,7 @@ CSV summary utility for the MCP Data Assistant.
     • must have `.csv` extension (case-insensitive).
 * Protects memory: raises MemoryError if the file holds more
   than 1,000,000 rows.
+* Caches each file's summary until its mtime or size changes.
 * Intelligent file discovery:
     • Searches in standard locations (/uploads, /data)
     • Handles both relative and absolute paths
@@ -24,12 +25,60 @@ CSV summary utility for the MCP Data Assistant.
 from __future__ import annotations
 
 import os
+import numpy as np
 import pandas as pd
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from .default_paths import find_file
 
 MAX_ROWS = 1_000_000
+CHUNK_ROWS = 100_000
+
+
+def _merge_dtype(seen, dtype):
+    """Combine the dtypes one column got in different chunks, as a single read would."""
+    if seen == dtype:
+        return dtype
+    if seen.kind in "iuf" and dtype.kind in "iuf":
+        # e.g. int64 in one chunk and float64 (NaN) in another gives float64
+        return np.result_type(seen, dtype)
+    return np.dtype(object)
+
+
+@lru_cache(maxsize=64)
+def _summarise_cached(path: str, mtime_ns: int, size: int) -> Tuple[int, Tuple[Tuple[str, str, int], ...]]:
+    """Return (row_count, ((name, dtype, missing), ...)) for the CSV at ``path``.
+
+    ``mtime_ns`` and ``size`` are not read; they change the cache key when the file does.
+    """
+    # Read the CSV in chunks so memory stays bounded by CHUNK_ROWS and an
+    # oversized file is rejected as soon as it crosses MAX_ROWS
+    row_count = 0
+    names: List[str] = []
+    missing = np.zeros(0, dtype=np.int64)
+    dtypes: List[Any] = []
+    with pd.read_csv(path, chunksize=CHUNK_ROWS, low_memory=False) as reader:
+        for chunk in reader:
+            row_count += len(chunk)
+            if row_count > MAX_ROWS:
+                raise MemoryError(f"CSV too large (over {MAX_ROWS:,} rows). Limit is {MAX_ROWS:,}.")
+            # Count missing values for every column in one vectorised pass
+            chunk_missing = chunk.isna().sum().to_numpy()
+            chunk_dtypes = chunk.dtypes.tolist()
+            if not names:
+                names = list(chunk.columns)
+                missing = chunk_missing
+                dtypes = chunk_dtypes
+                continue
+            missing += chunk_missing
+            if chunk_dtypes != dtypes:
+                dtypes = [_merge_dtype(a, b) for a, b in zip(dtypes, chunk_dtypes)]
+
+    columns = tuple(
+        (col, str(dtype), int(count)) for col, dtype, count in zip(names, dtypes, missing)
+    )
+    return row_count, columns
 
 
 def summarise_csv(file_input: Any) -> Dict[str, object]:
@@ -119,28 +168,19 @@ def summarise_csv(file_input: Any) -> Dict[str, object]:
     print(f"DEBUG CSV TOOL - Is file: {path_obj.is_file()}")
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(file_path)
-        if len(df) > MAX_ROWS:
-            raise MemoryError(f"CSV too large ({len(df):,} rows). Limit is {MAX_ROWS:,}.")
-    
-        # Process the dataframe
-        columns: List[Dict[str, object]] = []
-        for col in df.columns:
-            series = df[col]
-            columns.append(
-                {
-                    "name": col,
-                    "inferred_type": str(series.dtype),
-                    "missing_values": int(series.isna().sum()),
-                }
-            )
+        # Reuse the summary while the file is unchanged; a new mtime or size
+        # is a new cache key, so edits are picked up automatically
+        st = path_obj.stat()
+        row_count, columns = _summarise_cached(str(path_obj.resolve()), st.st_mtime_ns, st.st_size)
     
-        # Return the analysis
+        # Return the analysis, with fresh column dicts so callers cannot alter the cache
         return {
-            "row_count": int(len(df)),
-            "column_count": int(len(df.columns)),
-            "columns": columns,
+            "row_count": row_count,
+            "column_count": len(columns),
+            "columns": [
+                {"name": name, "inferred_type": dtype, "missing_values": count}
+                for name, dtype, count in columns
+            ],
             "filename": os.path.basename(file_path),
             "filepath": file_path  # Include full path for reference
         }
@@ -150,6 +190,9 @@ def summarise_csv(file_input: Any) -> Dict[str, object]:
         raise ValueError(f"Error analyzing CSV file at {file_path}: {str(e)}")
 
 
+summarise_csv.cache_clear = _summarise_cached.cache_clear
+
+
 if __name__ == "__main__":  # quick manual check
     import json
 
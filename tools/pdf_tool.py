@@ -5,6 +5,8 @@ Professional PDF generator using ReportLab.
 from __future__ import annotations
 
 import datetime as _dt
+import functools
+import io
 from pathlib import Path
 from typing import Dict, List, Any
 import tempfile
@@ -25,8 +27,17 @@ from reportlab.platypus import (
 )
 import matplotlib.pyplot as _plt
 
-REPORT_DIR = Path(__file__).resolve().parent.parent / "reports"
-REPORT_DIR.mkdir(exist_ok=True)
+# Reports without an explicit out_path go here; the REPORT_DIR env var overrides it
+REPORT_DIR = Path(
+    os.getenv("REPORT_DIR") or Path(__file__).resolve().parent.parent / "reports"
+)
+REPORT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@functools.lru_cache(maxsize=8)
+def _image_bytes(path: str, mtime_ns: int) -> bytes:
+    """Read an image file once per path and modification time."""
+    return Path(path).read_bytes()
 
 
 class PdfReportBuilder:
@@ -36,6 +47,8 @@ class PdfReportBuilder:
         self.out_path = Path(out_path)
         self.story: List[Flowable] = []
         self.tmp_pngs: List[str] = []
+        # One matplotlib figure, created on first use, is redrawn for every chart
+        self._chart_fig = None
         self.styles = getSampleStyleSheet()
         self.doc = SimpleDocTemplate(str(self.out_path), pagesize=A4)
 
@@ -46,10 +59,15 @@ class PdfReportBuilder:
         summary: str | None = None,
     ) -> None:
         """Insert a cover page with optional logo and summary."""
-        if logo_path and Path(logo_path).exists():
+        try:
+            logo_mtime = os.stat(logo_path).st_mtime_ns if logo_path else None
+        except OSError:
+            logo_mtime = None
+        if logo_mtime is not None:
+            # The logo is the same on every report, so its bytes are read once
             self.story.append(
                 Image(
-                    str(logo_path),
+                    io.BytesIO(_image_bytes(str(logo_path), logo_mtime)),
                     width=80,
                     height=80,
                     kind="proportional",
@@ -92,8 +110,10 @@ class PdfReportBuilder:
         elif stype == "chart":
             spec = section.get("chart_spec", {})
             specs = spec if isinstance(spec, list) else [spec]
+            if specs and self._chart_fig is None:
+                self._chart_fig = _plt.figure()
             for cs in specs:
-                png = create_chart(cs)
+                png = create_chart(cs, fig=self._chart_fig)
                 width = cs.get("width", 400)
                 height = cs.get("height", 250)
                 self.story.append(Image(png, width=width, height=height))
@@ -107,18 +127,23 @@ class PdfReportBuilder:
     def save(self) -> str:
         """Finalize the PDF and clean up temporary files."""
         self.doc.build(self.story)
+        self._cleanup()
+        return str(self.out_path.resolve())
+
+    def _cleanup(self) -> None:
+        """Close the chart figure and delete temporary chart images."""
+        if self._chart_fig is not None:
+            _plt.close(self._chart_fig)
+            self._chart_fig = None
         for png in self.tmp_pngs:
             if os.path.exists(png):
                 os.unlink(png)
-        return str(self.out_path.resolve())
 
     def __enter__(self) -> "PdfReportBuilder":
         return self
 
     def __exit__(self, exc_type, exc, tb) -> None:
-        for png in self.tmp_pngs:
-            if os.path.exists(png):
-                os.unlink(png)
+        self._cleanup()
 
 
 def _build_table(data: Dict[str, object]) -> Table:
@@ -226,15 +251,12 @@ def _build_table_from_list(data: List[Any]) -> Table:
     return Table(rows, style=TableStyle(styles))
 
 
-def create_chart(chart_spec: Dict[str, Any]) -> str:
-    """Generate a chart image from a specification and return PNG path."""
+def _draw_chart(ax, chart_spec: Dict[str, Any]) -> None:
+    """Draw the chart described by ``chart_spec`` onto an existing Axes."""
     chart_type = chart_spec.get("chart_type", "bar")
     labels = chart_spec.get("labels", [])
     values = chart_spec.get("values", [])
     color = chart_spec.get("color", "#143d8d")
-    width = float(chart_spec.get("width", 6))
-    height = float(chart_spec.get("height", 3.5))
-    fig, ax = _plt.subplots(figsize=(width, height))
 
     if chart_type == "bar":
         ax.bar(labels, values, color=color)
@@ -245,10 +267,29 @@ def create_chart(chart_spec: Dict[str, Any]) -> str:
     else:
         raise ValueError(f"Unsupported chart type: {chart_type}")
 
-    fig.tight_layout()
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    fig.savefig(tmp.name, bbox_inches="tight")
-    _plt.close(fig)
+
+def create_chart(chart_spec: Dict[str, Any], fig=None) -> str:
+    """Generate a chart image from a specification and return PNG path.
+
+    A figure passed in is cleared, redrawn and left open for the caller;
+    otherwise a figure is created and closed for this one chart.
+    """
+    width = float(chart_spec.get("width", 6))
+    height = float(chart_spec.get("height", 3.5))
+    owns_fig = fig is None
+    if owns_fig:
+        fig = _plt.figure(figsize=(width, height))
+    else:
+        fig.clf()
+        fig.set_size_inches(width, height)
+    try:
+        _draw_chart(fig.add_subplot(), chart_spec)
+        fig.tight_layout()
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
+        fig.savefig(tmp.name, bbox_inches="tight")
+    finally:
+        if owns_fig:
+            _plt.close(fig)
     return tmp.name
 
 